@@ -0,0 +1,169 @@
+'''
+Local stand-in of the Suez portal, emulating the flow expected by AsyncClient:
+redirect to login page, login page with escaped CSRF token, credential POST, and JSON API endpoints.
+'''
+import asyncio
+import datetime
+import os
+import random
+import secrets
+import sys
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_ROOT)
+from aiohttp import web
+from toutsurmoneau.async_client import (PAGE_LOGIN, PAGE_DASHBOARD, API_ENDPOINT_CONTRACT,
+                                        API_ENDPOINT_METER_LIST, API_ENDPOINT_TELEMETRY)
+
+SESSION_COOKIE = 'eZSESSID'
+# size of filler in login page, real page is about 100 kB
+LOGIN_PAGE_PADDING = 100000
+
+
+class Portal():
+    '''
+    Any username is accepted with password equal to PASSWORD.
+    '''
+    PASSWORD = 'secret'
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, meters: int = 1,
+                 compress: bool = False) -> None:
+        '''
+        :param latency: delay in seconds added to each response
+        :param failure_rate: probability of answering 503 to an API call
+        :param meters: number of meters of each account
+        :param compress: compress responses if accepted by client
+        '''
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.meters = meters
+        self.compress = compress
+        # session id -> csrf token, or username once logged in
+        self._sessions = {}
+        self.requests = 0
+        self.logins = 0
+
+    def reset_counters(self) -> None:
+        self.requests = 0
+        self.logins = 0
+
+    def expire_sessions(self) -> None:
+        self._sessions.clear()
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _username(self, request: web.Request):
+        value = self._sessions.get(request.cookies.get(SESSION_COOKIE))
+        if isinstance(value, tuple):
+            return value[0]
+        return None
+
+    async def _login_page(self, request: web.Request) -> web.Response:
+        await self._delay()
+        session_id = request.cookies.get(SESSION_COOKIE) or secrets.token_hex(16)
+        token = secrets.token_urlsafe(24)
+        self._sessions[session_id] = token
+        # token is in a JSON string embedded in HTML, with unicode escapes
+        page = ('<html><body>' + ' ' * LOGIN_PAGE_PADDING +
+                '<div data-props="{\\u0022csrfToken\\u0022\\u003A\\u0022' + token + '\\u0022,\\u0022x\\u0022:1}"></div>'
+                + ' ' * LOGIN_PAGE_PADDING + '</body></html>')
+        response = web.Response(text=page, content_type='text/html')
+        response.set_cookie(SESSION_COOKIE, session_id)
+        if self.compress:
+            response.enable_compression()
+        return response
+
+    async def _login(self, request: web.Request) -> web.Response:
+        await self._delay()
+        form = await request.post()
+        session_id = request.cookies.get(SESSION_COOKIE)
+        if (self._sessions.get(session_id) == form.get('_csrf_token')
+                and form.get('tsme_user_login[_password]') == self.PASSWORD):
+            self._sessions[session_id] = (form.get('tsme_user_login[_username]'),)
+            self.logins += 1
+            raise web.HTTPFound(PAGE_DASHBOARD)
+        raise web.HTTPFound(PAGE_LOGIN)
+
+    async def _dashboard(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.Response(text='<html></html>', content_type='text/html')
+
+    async def _api(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if self.failure_rate and random.random() < self.failure_rate:
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        username = self._username(request)
+        if username is None:
+            raise web.HTTPFound(PAGE_LOGIN)
+        if request.path == API_ENDPOINT_CONTRACT:
+            content = [{'isActif': True, 'numContrat': f'{username}-1', 'searchData': '', 'website-link': ''}]
+        elif request.path == API_ENDPOINT_METER_LIST:
+            content = {'nbMeters': self.meters, 'clientCompteursPro': [{'compteursPro': [
+                {'idPDS': f'{username}-{number}'} for number in range(self.meters)]}]}
+        else:
+            content = {'measures': self.measures(request.query['mode'],
+                                                 datetime.date.fromisoformat(request.query['start_date']),
+                                                 datetime.date.fromisoformat(request.query['end_date']))}
+        response = web.json_response({'code': '00', 'message': 'OK', 'content': content})
+        if self.compress:
+            response.enable_compression()
+        return response
+
+    @staticmethod
+    def measures(mode: str, date_begin: datetime.date, date_end: datetime.date) -> list:
+        '''
+        :returns: synthetic measures: index grows every day, no value from today
+        '''
+        today = datetime.date.today()
+        result = []
+        date = date_begin if mode == 'daily' else date_begin.replace(day=1)
+        while date <= date_end:
+            if mode == 'daily':
+                next_date = date + datetime.timedelta(days=1)
+            else:
+                next_date = (date + datetime.timedelta(days=32)).replace(day=1)
+            valid = date < today
+            result.append({
+                'date': f'{date.isoformat()} 00:00:00',
+                'volume': round(0.15 * (next_date - date).days, 3) if valid else None,
+                'index': round(100 + 0.15 * (date.toordinal() - 730000), 3) if valid else 0,
+            })
+            date = next_date
+        return result
+
+    def application(self) -> web.Application:
+        application = web.Application()
+        application.router.add_get(PAGE_LOGIN, self._login_page)
+        application.router.add_post(PAGE_LOGIN, self._login)
+        application.router.add_get(PAGE_DASHBOARD, self._dashboard)
+        for endpoint in [API_ENDPOINT_CONTRACT, API_ENDPOINT_METER_LIST, API_ENDPOINT_TELEMETRY]:
+            application.router.add_get(endpoint, self._api)
+        return application
+
+    async def start(self, port: int = 0) -> str:
+        '''
+        Start serving on localhost.
+
+        :returns: base URL of the portal (host name, as cookies are not accepted by aiohttp for IP addresses)
+        '''
+        self._runner = web.AppRunner(self.application())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f'http://localhost:{port}'
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Run the stand-in portal')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--failure_rate', type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(Portal(args.latency, args.failure_rate).application(), host='127.0.0.1', port=args.port)
@@ -0,0 +1,203 @@
+'''
+Offline benchmarks of toutsurmoneau against the local stand-in portal.
+
+Usage: python3 bench/run.py [--latency 0.02] [--accounts 100] [--json results.json]
+'''
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_ROOT)
+import aiohttp
+import toutsurmoneau
+from portal import Portal
+
+
+def _percentile(samples: list, ratio: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(ratio * len(samples)))]
+
+
+async def bench_login(portal: Portal, url: str, iterations: int, retry_policy: toutsurmoneau.RetryPolicy) -> dict:
+    '''
+    Cost of a first call: redirect, login page, credentials, retry.
+    '''
+    durations = []
+    login_bytes = 0
+    errors = 0
+    portal.reset_counters()
+    for number in range(iterations):
+        async with aiohttp.ClientSession() as session:
+            client = toutsurmoneau.AsyncClient(f'user{number}', Portal.PASSWORD, url=url, session=session,
+                                               retry_policy=retry_policy)
+            start = time.perf_counter()
+            try:
+                await client.async_contracts()
+            except Exception:
+                errors += 1
+                continue
+            durations.append(time.perf_counter() - start)
+            login_bytes += client.counters()['login_page_bytes']
+    succeeded = max(1, iterations - errors)
+    return {
+        'median_ms': 1000 * statistics.median(durations) if durations else 0.0,
+        'requests_per_login': portal.requests / iterations,
+        'login_page_kb': login_bytes / succeeded / 1024,
+        'errors': errors,
+    }
+
+
+async def bench_call(portal: Portal, url: str, iterations: int, retry_policy: toutsurmoneau.RetryPolicy) -> dict:
+    '''
+    Latency of calls on a logged-in client.
+    '''
+    result = {}
+    async with aiohttp.ClientSession() as session:
+        client = toutsurmoneau.AsyncClient('user', Portal.PASSWORD, url=url, session=session,
+                                           retry_policy=retry_policy)
+        try:
+            await client.async_meter_id()
+        except Exception:
+            # calls below login again, and count errors
+            pass
+        calls = {
+            'contracts': client.async_contracts,
+            'daily_for_month': lambda: client.async_daily_for_month(datetime.date.today()),
+            'latest_meter_reading': client.async_latest_meter_reading,
+        }
+        for name, call in calls.items():
+            durations = []
+            errors = 0
+            for _ in range(iterations):
+                start = time.perf_counter()
+                try:
+                    await call()
+                except Exception:
+                    errors += 1
+                    continue
+                durations.append(time.perf_counter() - start)
+            result[name] = {
+                'p50_ms': 1000 * _percentile(durations, 0.5) if durations else 0.0,
+                'p95_ms': 1000 * _percentile(durations, 0.95) if durations else 0.0,
+                'errors': errors,
+            }
+    return result
+
+
+async def bench_fleet(portal: Portal, url: str, accounts: int, concurrency: int,
+                      retry_policy: toutsurmoneau.RetryPolicy) -> dict:
+    '''
+    Throughput of latest reading on many accounts.
+    '''
+    portal.reset_counters()
+    fleet_accounts = [(f'user{number}', Portal.PASSWORD, None, url) for number in range(accounts)]
+    start = time.perf_counter()
+    async with toutsurmoneau.AsyncFleet(fleet_accounts, max_concurrency=concurrency,
+                                        max_per_host=concurrency, retry_policy=retry_policy) as fleet:
+        errors = sum(1 for result in await fleet.async_run('latest_meter_reading') if result.error is not None)
+    duration = time.perf_counter() - start
+    return {
+        'accounts_per_s': accounts / duration,
+        'requests': portal.requests,
+        'errors': errors,
+    }
+
+
+def bench_parse(years: int) -> dict:
+    '''
+    CPU time to turn a large daily telemetry payload into results.
+    '''
+    today = datetime.date.today()
+    measures = Portal.measures('daily', datetime.date(today.year - years, 1, 1), today)
+    payload = json.dumps({'content': {'measures': measures}})
+    result = {'rows': len(measures), 'payload_kb': len(payload) / 1024}
+    start = time.perf_counter()
+    decoded = json.loads(payload)['content']['measures']
+    result['json_decode_ms'] = 1000 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    for measure in decoded:
+        if measure['index'] is not None and int(measure['index']) != 0:
+            datetime.datetime.strptime(measure['date'].split(' ')[0], '%Y-%m-%d')
+            int(1000 * measure['volume'])
+    result['strptime_rows_ms'] = 1000 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    series = toutsurmoneau.TelemetrySeries.from_measures(decoded, 'daily')
+    result['series_build_ms'] = 1000 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    series.monthly_view()
+    result['series_view_ms'] = 1000 * (time.perf_counter() - start)
+    return result
+
+
+def bench_startup(iterations: int) -> dict:
+    '''
+    Wall time of short-lived processes: import of the package, and CLI startup.
+    '''
+    commands = {
+        'import_ms': ['-c', 'import toutsurmoneau'],
+        'import_client_ms': ['-c', 'import toutsurmoneau; toutsurmoneau.AsyncClient'],
+        'cli_help_ms': ['-m', 'toutsurmoneau', '-h'],
+    }
+    environment = dict(os.environ, PYTHONPATH=PACKAGE_ROOT)
+    result = {}
+    for name, arguments in commands.items():
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + arguments, env=environment, check=True, stdout=subprocess.DEVNULL)
+            durations.append(time.perf_counter() - start)
+        result[name] = 1000 * statistics.median(durations)
+    return result
+
+
+async def run(args) -> dict:
+    portal = Portal(latency=args.latency, failure_rate=args.failure_rate, compress=args.compress)
+    url = await portal.start()
+    # short delays: the portal asks to retry immediately
+    retry_policy = toutsurmoneau.RetryPolicy(attempts=args.attempts, backoff=0.01)
+    try:
+        return {
+            'login': await bench_login(portal, url, args.iterations, retry_policy),
+            'call': await bench_call(portal, url, args.iterations, retry_policy),
+            'fleet': await bench_fleet(portal, url, args.accounts, args.concurrency, retry_policy),
+            'parse': bench_parse(args.years),
+            'start': bench_startup(args.iterations),
+        }
+    finally:
+        await portal.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Offline benchmarks against the stand-in portal')
+    parser.add_argument('--latency', type=float, default=0.01, help='Portal latency per response, in seconds')
+    parser.add_argument('--failure_rate', type=float, default=0.0, help='Probability of 503 on API calls')
+    parser.add_argument('--attempts', type=int, default=3, help='Attempts of each request on transient errors')
+    parser.add_argument('--compress', action='store_true', help='Portal compresses responses')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--years', type=int, default=5, help='Years of daily data for parse benchmark')
+    parser.add_argument('--json', help='Write results to this file, for comparison between versions')
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    for group, values in results.items():
+        for name, value in values.items():
+            if isinstance(value, dict):
+                value = ', '.join(f'{key}={item:.2f}' if isinstance(item, float) else f'{key}={item}'
+                                  for key, item in value.items())
+            elif isinstance(value, float):
+                value = f'{value:.2f}'
+            print(f'{group:6} {name:22} {value}')
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,69 @@
 '''Tout sur mon eau module'''
-from .client import Client
-from .async_client import AsyncClient
-from .errors import ClientError
+from typing import TYPE_CHECKING
+from .errors import ClientError, CircuitOpenError
 from .const import KNOWN_PROVIDER_URLS
 __version__ = '0.0.27'
+
+# public name -> submodule, imported on first access (aiohttp is slow to import)
+_LAZY_ATTRIBUTES = {
+    'Client': 'client',
+    'AsyncClient': 'async_client',
+    'AsyncFleet': 'fleet',
+    'FleetAccount': 'fleet',
+    'FleetResult': 'fleet',
+    'read_accounts': 'fleet',
+    'ShardRunner': 'shard',
+    'PollingScheduler': 'scheduler',
+    'ReadingServer': 'server',
+    'async_poll': 'scheduler',
+    'ProviderCache': 'discovery',
+    'async_discover_provider': 'discovery',
+    'Metrics': 'metrics',
+    'ConnectionPool': 'pool',
+    'RateLimiter': 'resilience',
+    'RetryPolicy': 'resilience',
+    'CircuitBreaker': 'resilience',
+    'SessionStore': 'session_store',
+    'TelemetryStore': 'store',
+    'TelemetrySeries': 'series',
+    'TelemetryAnalytics': 'analytics',
+}
+
+if TYPE_CHECKING:
+    from .client import Client
+    from .async_client import AsyncClient
+    from .fleet import AsyncFleet, FleetAccount, FleetResult, read_accounts
+    from .shard import ShardRunner
+    from .scheduler import PollingScheduler, async_poll
+    from .server import ReadingServer
+    from .discovery import ProviderCache, async_discover_provider
+    from .metrics import Metrics
+    from .pool import ConnectionPool
+    from .resilience import RateLimiter, RetryPolicy, CircuitBreaker
+    from .session_store import SessionStore
+    from .store import TelemetryStore
+    from .series import TelemetrySeries
+    from .analytics import TelemetryAnalytics
+
+
+__all__ = ['ClientError', 'CircuitOpenError', 'KNOWN_PROVIDER_URLS'] + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    import importlib
+    if name not in _LAZY_ATTRIBUTES:
+        # submodule, e.g. toutsurmoneau.async_client
+        try:
+            return importlib.import_module(f'.{name}', __name__)
+        except ModuleNotFoundError as error:
+            if error.name != f'{__name__}.{name}':
+                raise
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_LAZY_ATTRIBUTES[name]}', __name__), name)
+    # next accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
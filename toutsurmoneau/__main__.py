@@ -1,11 +1,12 @@
+from __future__ import annotations
 import toutsurmoneau
+import toutsurmoneau.export
 import argparse
 import sys
-import yaml
 import datetime
 import logging
-import asyncio
-import aiohttp
+# asyncio, aiohttp and yaml are imported only when needed: faster startup
+from typing import Optional, List, Tuple
 
 COMMANDS = [
     'attributes',
@@ -16,7 +17,12 @@ COMMANDS = [
     'monthly_recent',
     'daily_for_month',
     'check_credentials',
-    'telemetry'
+    'telemetry',
+    'meters_summary',
+    'analytics',
+    'discover',
+    'export',
+    'serve'
 ]
 
 def command_line() -> None:
@@ -33,14 +39,33 @@ def command_line() -> None:
                 if '=' in line and not line.startswith('#'):
                     key, value = line.strip().split('=', 1)
                     config[key] = value
-    parser.add_argument('-u', '--username', required=not 'username' in config, help='Suez username')
-    parser.add_argument('-p', '--password', required=not 'password' in config, help='Password')
+    parser.add_argument('-u', '--username', required=False, help='Suez username')
+    parser.add_argument('-p', '--password', required=False, help='Password')
     parser.add_argument('-c', '--meter_id', required=False, help='Water Meter Id')
     parser.add_argument('-U', '--url', required=False, help='full URL of provider, including mon-compte-en-ligne')
     parser.add_argument('-e', '--execute', required=False, default='check_credentials',
-                        help=f'Command to execute: {", ".join(COMMANDS)}')
+                        help=f'Command to execute: {", ".join(COMMANDS)}, or comma-separated list of commands')
     parser.add_argument('-d', '--data', required=False,
                         help='Additional data for the command (e.g. date for daily_for_month)')
+    parser.add_argument('-b', '--batch', required=False,
+                        help='Path to file with one command per line, optionally followed by its data')
+    parser.add_argument('-a', '--accounts', required=False,
+                        help='Path to CSV file of accounts (username,password[,meter_id[,url]]), for export and serve')
+    parser.add_argument('-f', '--format', required=False, default='yaml', choices=toutsurmoneau.export.EXPORT_FORMATS,
+                        help='Output format of export')
+    parser.add_argument('-o', '--output', required=False, help='Output file of export, default: stdout')
+    parser.add_argument('-l', '--listen', required=False, default='127.0.0.1:8080',
+                        help='Address and port of serve')
+    parser.add_argument('-r', '--refresh', required=False, type=float, default=3600,
+                        help='Seconds between refreshes of data of an account, for serve')
+    parser.add_argument('-s', '--session_file', required=False,
+                        help='Path to file where login session is kept between runs')
+    parser.add_argument('-P', '--provider_file', required=False,
+                        help='Path to file where the provider found for the account is kept (see discover)')
+    parser.add_argument('--store', required=False,
+                        help='Path to SQLite file where telemetry is kept, so that only new values are fetched')
+    parser.add_argument('--metrics', action='store_true', default=False,
+                        help='Print request metrics on stderr, in Prometheus text format')
     parser.add_argument('--debug', action='store_true', default=False)
     parser.add_argument('--legacy', action='store_true', default=False)
     parser.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
@@ -49,16 +74,60 @@ def command_line() -> None:
     for key, value in config.items():
         if not getattr(args, key):
             setattr(args, key, value)
+    if args.accounts is None and (args.username is None or args.password is None):
+        parser.error('the following arguments are required: -u/--username, -p/--password')
 
     if args.debug:
         logging.basicConfig(level=logging.DEBUG)
+    if args.execute == 'serve':
+        serve(args)
+        return
+    import asyncio
+    if args.execute == 'export':
+        if args.output is None:
+            failures = asyncio.run(async_export(args, sys.stdout))
+        else:
+            with open(args.output, 'w', newline='') as file:
+                failures = asyncio.run(async_export(args, file))
+        if failures:
+            # partial export
+            sys.exit(1)
+        return
     if args.legacy:
         result = legacy_execute(args)
     else:
         result = asyncio.run(async_execute(args))
+    import yaml
     yaml.dump(result, sys.stdout)
 
 
+def session_store(args) -> Optional[toutsurmoneau.SessionStore]:
+    '''
+    :returns: the session store if requested on command line
+    '''
+    if args.session_file is None:
+        return None
+    return toutsurmoneau.SessionStore(args.session_file)
+
+
+def telemetry_store(args) -> Optional[toutsurmoneau.TelemetryStore]:
+    '''
+    :returns: the telemetry store if requested on command line
+    '''
+    if args.store is None:
+        return None
+    return toutsurmoneau.TelemetryStore(args.store)
+
+
+def provider_cache(args) -> Optional[toutsurmoneau.ProviderCache]:
+    '''
+    :returns: the provider cache if requested on command line
+    '''
+    if args.provider_file is None:
+        return None
+    return toutsurmoneau.ProviderCache(args.provider_file)
+
+
 def legacy_execute(args) -> dict:
     '''
     Execute the command in legacy mode (sync).
@@ -67,7 +136,9 @@ def legacy_execute(args) -> dict:
         username=args.username,
         password=args.password,
         meter_id=args.meter_id,
-        provider=args.url)
+        provider=args.url,
+        session_store=session_store(args),
+        store=telemetry_store(args))
     try:
         if args.execute == 'check_credentials':
             data = client.check_credentials()
@@ -98,46 +169,172 @@ async def async_execute(args) -> dict:
     '''
     Execute the CLI command in async mode.
     '''
+    import aiohttp
     trace_config = aiohttp.TraceConfig()
     if args.debug:
         trace_config.on_request_start.append(on_request_start)
-    async with aiohttp.ClientSession(trace_configs=[trace_config]) as session:
+    trace_configs = [trace_config]
+    metrics = None
+    if args.metrics:
+        metrics = toutsurmoneau.Metrics()
+        trace_configs.append(metrics.trace_config())
+    async with aiohttp.ClientSession(trace_configs=trace_configs) as session:
+        if args.execute == 'discover' or (args.url is None and args.provider_file is not None):
+            url = await toutsurmoneau.async_discover_provider(
+                args.username, args.password, session=session, cache=provider_cache(args))
+            if args.execute == 'discover':
+                return url
+            if url is None:
+                raise Exception('No provider accepts these credentials')
+            args.url = url
         client = toutsurmoneau.AsyncClient(
             username=args.username,
             password=args.password,
             meter_id=args.meter_id,
             url=args.url,
-            session=session)
-        if args.execute == 'check_credentials':
-            data = await client.async_check_credentials()
-        elif args.execute == 'contracts':
-            data = await client.async_contracts()
-        elif args.execute == 'meter_id':
-            data = await client.async_meter_id()
-        elif args.execute == 'meter_list':
-            data = await client.async_meter_list()
-        elif args.execute == 'latest_meter_reading':
-            data = await client.async_latest_meter_reading()
-        elif args.execute == 'monthly_recent':
-            data = await client.async_monthly_recent()
-        elif args.execute == 'daily_for_month':
-            if args.data is None:
-                test_date = datetime.date.today()
-            else:
-                test_date = datetime.datetime.strptime(args.data, '%Y%m').date()
-            data = await client.async_daily_for_month(test_date)
-        elif args.execute == 'telemetry':
-            if args.data is None:
-                raise "Provide <montly>,<begin>,<end>"
-            mode, begin_str, end_str = args.data.split(',')
-            begin = datetime.datetime.strptime(begin_str, "%Y-%m-%d").date()
-            end = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
-            data = await client.async_telemetry(mode,begin,end)
+            session=session,
+            session_store=session_store(args),
+            store=telemetry_store(args),
+            metrics=metrics)
+        commands = command_list(args)
+        if len(commands) == 1 and args.batch is None:
+            data = await async_command(client, *commands[0])
         else:
-            _LOGGER.error(f'Use one of: {", ".join(COMMANDS)}')
-            raise Exception(f'No such command: {args.execute}')
+            data = await async_commands(client, commands)
+        if metrics is not None:
+            sys.stderr.write(metrics.to_prometheus())
         return data
 
 
+async def async_export(args, file) -> int:
+    '''
+    Stream telemetry of the account, or of all accounts of --accounts, to file.
+
+    :returns: number of accounts that failed
+    '''
+    if args.data is None:
+        raise Exception('Provide <mode>,<begin>,<end>')
+    mode, begin_str, end_str = args.data.split(',')
+    begin = datetime.datetime.strptime(begin_str, "%Y-%m-%d").date()
+    end = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
+    writer = toutsurmoneau.export.telemetry_writer(args.format, file)
+    accounts = command_accounts(args)
+
+    async def export_account(client: toutsurmoneau.AsyncClient) -> int:
+        return await toutsurmoneau.export.async_export_telemetry(
+            client, writer, mode, begin, end, client.username())
+
+    metrics = toutsurmoneau.Metrics() if args.metrics else None
+    failures = 0
+    async with toutsurmoneau.AsyncFleet(accounts, metrics=metrics, session_store=session_store(args),
+                                        store=telemetry_store(args)) as fleet:
+        async for result in fleet.as_completed(export_account):
+            if result.error is not None:
+                failures += 1
+                _LOGGER.error('Export failed for %s: %s', result.account.username, result.error)
+    if metrics is not None:
+        sys.stderr.write(metrics.to_prometheus())
+    return failures
+
+
+def command_accounts(args) -> List[toutsurmoneau.FleetAccount]:
+    '''
+    :returns: accounts of --accounts, or the one on command line
+    '''
+    if args.accounts is None:
+        return [toutsurmoneau.FleetAccount(args.username, args.password, args.meter_id, args.url)]
+    # URL on command line is the default for accounts without one
+    return [account._replace(url=account.url or args.url) for account in toutsurmoneau.read_accounts(args.accounts)]
+
+
+def serve(args) -> None:
+    '''
+    Serve data of accounts over local HTTP until interrupted.
+    '''
+    from toutsurmoneau.server import ReadingServer
+    host, port = args.listen.rsplit(':', 1)
+    ReadingServer(command_accounts(args), refresh_interval=args.refresh, session_store=session_store(args),
+                  store=telemetry_store(args)).run(host, int(port))
+
+
+def command_list(args) -> List[Tuple[str, Optional[str]]]:
+    '''
+    :returns: list of (command, data) from --batch file if provided, else from --execute and --data
+    '''
+    if args.batch is None:
+        return [(command.strip(), args.data) for command in args.execute.split(',')]
+    commands = []
+    with open(args.batch, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                fields = line.split(None, 1)
+                commands.append((fields[0], fields[1] if len(fields) > 1 else None))
+    return commands
+
+
+async def async_commands(client: toutsurmoneau.AsyncClient, commands: List[Tuple[str, Optional[str]]]) -> dict:
+    '''
+    Execute several commands concurrently on the same client (one login).
+
+    :returns: result of each command, keyed by command (and data if any), or its error
+    '''
+    if any(command not in ['check_credentials', 'contracts', 'meter_list', 'meters_summary']
+           for command, _ in commands):
+        # resolve meter id once, before concurrent requests (logs in only if the meter id must be read,
+        # else concurrent requests share the login of the first one)
+        try:
+            await client.async_meter_id()
+        except Exception as error:
+            _LOGGER.debug('Cannot get meter id: %s', error)
+    import asyncio
+    results = await asyncio.gather(*[async_command(client, command, data) for command, data in commands],
+                                   return_exceptions=True)
+    document = {}
+    for (command, data), result in zip(commands, results):
+        if isinstance(result, Exception):
+            result = {'error': str(result)}
+        document[command if data is None else f'{command} {data}'] = result
+    return document
+
+
+async def async_command(client: toutsurmoneau.AsyncClient, command: str, data: Optional[str]):
+    '''
+    Execute one CLI command in async mode.
+    '''
+    if command == 'check_credentials':
+        return await client.async_check_credentials()
+    elif command == 'contracts':
+        return await client.async_contracts()
+    elif command == 'meter_id':
+        return await client.async_meter_id()
+    elif command == 'meter_list':
+        return await client.async_meter_list()
+    elif command == 'latest_meter_reading':
+        return await client.async_latest_meter_reading()
+    elif command == 'monthly_recent':
+        return await client.async_monthly_recent()
+    elif command == 'meters_summary':
+        return await client.async_meters_summary()
+    elif command == 'analytics':
+        return await client.async_analytics()
+    elif command == 'daily_for_month':
+        if data is None:
+            test_date = datetime.date.today()
+        else:
+            test_date = datetime.datetime.strptime(data, '%Y%m').date()
+        return await client.async_daily_for_month(test_date)
+    elif command == 'telemetry':
+        if data is None:
+            raise Exception('Provide <mode>,<begin>,<end>')
+        mode, begin_str, end_str = data.split(',')
+        begin = datetime.datetime.strptime(begin_str, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
+        return await client.async_telemetry(mode, begin, end)
+    else:
+        _LOGGER.error(f'Use one of: {", ".join(COMMANDS)}')
+        raise Exception(f'No such command: {command}')
+
+
 if __name__ == '__main__':
     sys.exit(command_line())
@@ -0,0 +1,199 @@
+import bisect
+import collections
+import datetime
+from typing import Optional
+from .series import TelemetrySeries, METER_NO_VALUE, _numpy, _convert_volume
+
+# number of days of short and long rolling averages
+ANALYTICS_SHORT_WINDOW = 7
+ANALYTICS_LONG_WINDOW = 30
+# a day looks like continuous flow if its volume is above LEAK_RATIO times the long average of previous days...
+LEAK_RATIO = 1.5
+# ... and above this volume (m3)
+LEAK_MIN_VOLUME = 0.05
+# number of consecutive such days before a leak is suspected
+LEAK_DAYS = 3
+# minimum number of new measures for which the vectorized path (numpy) is used on empty state
+ANALYTICS_VECTOR_MIN = 1000
+
+
+class TelemetryAnalytics():
+    '''
+    Aggregates of telemetry of one meter and mode, updated incrementally with new measures.
+
+    Measures are expected in date order: a measure for the last date seen replaces it (e.g. current month),
+    older ones are ignored. Daily mode also maintains rolling averages and continuous flow detection.
+    Volumes are kept in API unit (m3) and converted in summary().
+    '''
+
+    def __init__(self, mode: str, use_litre: bool = True, short_window: int = ANALYTICS_SHORT_WINDOW,
+                 long_window: int = ANALYTICS_LONG_WINDOW, leak_ratio: float = LEAK_RATIO,
+                 leak_min_volume: float = LEAK_MIN_VOLUME, leak_days: int = LEAK_DAYS) -> None:
+        '''
+        :param mode: monthly or daily
+        :param use_litre: summary uses Litre as unit if True, else api native unit (cubic meter)
+        :param short_window: number of days of the short rolling average
+        :param long_window: number of days of the long rolling average, also baseline of continuous flow detection
+        :param leak_ratio: a day is above baseline if its volume exceeds leak_ratio times the long average before it
+        :param leak_min_volume: ...and exceeds this volume (m3)
+        :param leak_days: number of consecutive days above baseline for a suspected leak
+        '''
+        self.mode = mode
+        self.use_litre = use_litre
+        self._leak_ratio = leak_ratio
+        self._leak_min_volume = leak_min_volume
+        self._leak_days = leak_days
+        # (year, month) -> volume, year -> volume
+        self._monthly = {}
+        self._yearly = {}
+        self._highest = 0.0
+        self._last_ordinal = None
+        self._last_volume = 0.0
+        # daily mode: latest volumes and their sums
+        self._short = collections.deque(maxlen=short_window)
+        self._long = collections.deque(maxlen=long_window)
+        self._short_sum = 0.0
+        self._long_sum = 0.0
+        # baseline of the last day, and consecutive days above baseline before it, to replace the last day
+        self._last_baseline = None
+        self._above_before_last = 0
+        self._above = 0
+
+    def __len__(self) -> int:
+        '''
+        :returns: number of months with data
+        '''
+        return len(self._monthly)
+
+    @property
+    def last_date(self) -> Optional[datetime.date]:
+        '''
+        :returns: date of the latest measure, None if no measure yet
+        '''
+        return None if self._last_ordinal is None else datetime.date.fromordinal(self._last_ordinal)
+
+    def update(self, series: TelemetrySeries) -> int:
+        '''
+        Add the new valid measures of the series.
+
+        :returns: number of measures added or replaced
+        '''
+        series = series.valid()
+        if self._last_ordinal is None:
+            first = 0
+        else:
+            first = bisect.bisect_left(series.dates, self._last_ordinal)
+        if self._last_ordinal is None and len(series) >= ANALYTICS_VECTOR_MIN:
+            try:
+                self._update_vectorized(series)
+                return len(series)
+            except ImportError:
+                pass
+        for position in range(first, len(series)):
+            self._add(series.dates[position], series.volumes[position])
+        return len(series) - first
+
+    def _add(self, ordinal: int, volume: float) -> None:
+        '''
+        Add (or replace if same date as last) one measure.
+        '''
+        replace = ordinal == self._last_ordinal
+        old_volume = self._last_volume if replace else 0.0
+        date = datetime.date.fromordinal(ordinal)
+        month = (date.year, date.month)
+        self._monthly[month] = self._monthly.get(month, 0.0) + volume - old_volume
+        self._yearly[date.year] = self._yearly.get(date.year, 0.0) + volume - old_volume
+        if volume >= old_volume:
+            self._highest = max(self._highest, self._monthly[month])
+        else:
+            self._highest = max(self._monthly.values())
+        self._last_ordinal = ordinal
+        self._last_volume = volume
+        if self.mode != 'daily':
+            return
+        if replace:
+            self._short_sum += volume - self._short[-1]
+            self._long_sum += volume - self._long[-1]
+            self._short[-1] = volume
+            self._long[-1] = volume
+        else:
+            self._last_baseline = self._long_sum / len(self._long) if self._long else None
+            self._above_before_last = self._above
+            for window, attribute in [(self._short, '_short_sum'), (self._long, '_long_sum')]:
+                if len(window) == window.maxlen:
+                    setattr(self, attribute, getattr(self, attribute) - window[0])
+                window.append(volume)
+                setattr(self, attribute, getattr(self, attribute) + volume)
+        if self._is_above(volume, self._last_baseline):
+            self._above = self._above_before_last + 1
+        else:
+            self._above = 0
+
+    def _is_above(self, volume: float, baseline: Optional[float]) -> bool:
+        '''
+        :returns: True if the volume of a day looks like continuous flow, compared to the baseline before it
+        '''
+        return baseline is not None and volume >= self._leak_min_volume and volume > self._leak_ratio * baseline
+
+    def _update_vectorized(self, series: TelemetrySeries) -> None:
+        '''
+        Initialize state from a long series at once, same result as _add on each measure.
+        '''
+        numpy = _numpy()
+        columns = series.to_numpy(litre=False)
+        volumes = columns['volume']
+        months = columns['date'].astype('datetime64[M]').astype(numpy.int64)
+        keys, inverse = numpy.unique(months, return_inverse=True)
+        totals = numpy.bincount(inverse, weights=volumes)
+        for key, total in zip(keys.tolist(), totals.tolist()):
+            year = 1970 + key // 12
+            self._monthly[(year, key % 12 + 1)] = total
+            self._yearly[year] = self._yearly.get(year, 0.0) + total
+        self._highest = max(0.0, float(totals.max()))
+        self._last_ordinal = series.dates[-1]
+        self._last_volume = series.volumes[-1]
+        if self.mode != 'daily':
+            return
+        self._short.extend(volumes[-self._short.maxlen:].tolist())
+        self._long.extend(volumes[-self._long.maxlen:].tolist())
+        self._short_sum = sum(self._short)
+        self._long_sum = sum(self._long)
+        # baseline of each day: average of up to long_window previous days
+        count = len(volumes)
+        cumulated = numpy.concatenate(([0.0], numpy.cumsum(volumes)))
+        ends = numpy.arange(count)
+        starts = numpy.maximum(0, ends - self._long.maxlen)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            baselines = (cumulated[ends] - cumulated[starts]) / (ends - starts)
+        above = (ends > 0) & (volumes >= self._leak_min_volume) & (volumes > self._leak_ratio * baselines)
+        # consecutive days above baseline at the end, before the last day and including it
+        below = numpy.flatnonzero(~above[:-1])
+        self._above_before_last = count - 1 if len(below) == 0 else count - 2 - int(below[-1])
+        self._above = self._above_before_last + 1 if above[-1] else 0
+        self._last_baseline = float(baselines[-1]) if count > 1 else None
+
+    def _converted(self, value: Optional[float]):
+        '''
+        :returns: value converted from API (m3) to desired unit (m3 or litre)
+        '''
+        return _convert_volume(value, self.use_litre)
+
+    def summary(self, today: Optional[datetime.date] = None) -> dict:
+        '''
+        :param today: reference date for yearly volumes, default: today
+        :returns: highest_monthly_volume, last_year_volume, this_year_volume and, in daily mode,
+                  short and long rolling averages, and leak (continuous flow) detection
+        '''
+        if today is None:
+            today = datetime.date.today()
+        result = {
+            'highest_monthly_volume': self._converted(self._highest),
+            'last_year_volume': self._converted(self._yearly.get(today.year - 1, METER_NO_VALUE)),
+            'this_year_volume': self._converted(self._yearly.get(today.year, METER_NO_VALUE)),
+        }
+        if self.mode == 'daily':
+            result['short_average'] = self._converted(self._short_sum / len(self._short) if self._short else None)
+            result['long_average'] = self._converted(self._long_sum / len(self._long) if self._long else None)
+            result['continuous_flow_days'] = self._above
+            result['leak_suspected'] = self._above >= self._leak_days
+        return result
@@ -1,11 +1,22 @@
 import aiohttp
+import asyncio
 import datetime
 import calendar
+import collections
+import json
 import logging
 import re
-from typing import Optional, Union, Any
+from typing import Optional, Union, Any, AsyncIterator, List, Tuple
 from urllib.parse import urlparse
+from yarl import URL
 from .errors import ClientError
+from .session_store import SessionStore
+from .store import TelemetryStore
+from .cache import TTLCache
+from .series import TelemetrySeries, METER_NO_VALUE, _convert_volume
+from .analytics import TelemetryAnalytics
+from .metrics import Metrics
+from .resilience import RateLimiter, RetryPolicy, CircuitBreaker, TRANSIENT_HTTP_STATUSES
 
 _LOGGER = logging.getLogger(__name__)
 # Generic URL of Suez web site
@@ -19,10 +30,88 @@ API_ENDPOINT_METER_LIST = '/public-api/cel-consumption/meters-list'
 API_ENDPOINT_TELEMETRY = '/public-api/cel-consumption/telemetry'
 # regex for token in PAGE_LOGIN (before utf8 encoding)
 CSRF_TOKEN_REGEX = '\\\\u0022csrfToken\\\\u0022\\\\u003A\\\\u0022([^,]+)\\\\u0022'
+# compiled once, on raw bytes of login page
+_CSRF_TOKEN_PATTERN = re.compile(CSRF_TOKEN_REGEX.encode('ascii'))
+# bytes read at once from login page while looking for the CSRF token
+LOGIN_SCAN_CHUNK = 8192
+# bytes kept from previous chunks, so that a token across chunks is found
+LOGIN_SCAN_OVERLAP = 1024
+# statuses of redirects, to the login page when not logged in
+REDIRECT_HTTP_STATUSES = (301, 302, 303, 307, 308)
+# default number of chunks fetched in advance by async_iter_telemetry
+TELEMETRY_PREFETCH = 1
 # for retrieval of last reading
 METER_RETRIEVAL_MAX_DAYS_BACK = 5
-# no reading for meter (total is zero means no value available for meter reading)
-METER_NO_VALUE = 0
+
+
+def _retrieve_exception(task: asyncio.Future) -> None:
+    '''
+    Mark the exception of a shared task as retrieved: all its callers may have been cancelled.
+    '''
+    if not task.cancelled():
+        task.exception()
+
+
+class _SharedRequest():
+    '''
+    Request shared by concurrent callers, run in its own task: cancelling one caller does not cancel the request
+    of the others, but the request is cancelled once all its callers are.
+    '''
+
+    def __init__(self, requests: dict, key: Any, coroutine) -> None:
+        '''
+        :param requests: requests in progress, the request is in it until done or cancelled
+        :param key: key of the request in requests
+        :param coroutine: the request
+        '''
+        self._requests = requests
+        self._key = key
+        self._waiters = 0
+        requests[key] = self
+        self._task = asyncio.ensure_future(coroutine)
+        self._task.add_done_callback(_retrieve_exception)
+        self._task.add_done_callback(lambda task: self._forget())
+
+    def _forget(self) -> None:
+        '''
+        Remove the request from requests in progress, unless replaced by a new one.
+        '''
+        if self._requests.get(self._key) is self:
+            del self._requests[self._key]
+
+    async def wait(self) -> Any:
+        '''
+        :returns: result of the request
+        '''
+        self._waiters += 1
+        try:
+            return await asyncio.shield(self._task)
+        finally:
+            self._waiters -= 1
+            if self._waiters == 0 and not self._task.done():
+                # all callers cancelled: nobody needs the response
+                self._forget()
+                self._task.cancel()
+
+
+class _GuardedRequest():
+    '''
+    Request context manager: the request is sent by AsyncClient._async_send, the response is released on exit.
+    '''
+
+    def __init__(self, client: 'AsyncClient', method: str, url: str, kwargs: dict) -> None:
+        self._client = client
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._response = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        self._response = await self._client._async_send(self._method, self._url, self._kwargs)
+        return self._response
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._response.release()
 
 
 class AsyncClient():
@@ -32,7 +121,11 @@ class AsyncClient():
 
     def __init__(self, username: str, password: str, meter_id: Optional[str] = None,
                  url: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None,
-                 use_litre: bool = True) -> None:
+                 use_litre: bool = True, session_store: Optional[SessionStore] = None,
+                 store: Optional[TelemetryStore] = None, cache_ttl: float = 0,
+                 cache_size: int = 128, rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 metrics: Optional[Metrics] = None) -> None:
         '''
         Initialize the client object but no network connection is made.
 
@@ -42,6 +135,16 @@ class AsyncClient():
         :param url: URL of provider, e.g. one of KNOWN_PROVIDER_URLS or other URL of provider.
         :param session: an HTTP session
         :param use_litre: use Litre a unit if True, else use api native unit (cubic meter)
+        :param session_store: if provided, login cookies are restored from and saved to it
+        :param store: if provided, telemetry is kept in it and only missing dates are fetched
+        :param cache_ttl: if not zero, telemetry responses are kept in memory for that many seconds
+        :param cache_size: maximum number of telemetry responses kept in memory
+        :param rate_limiter: if provided, limits the rate of requests (share it between clients of same host)
+        :param retry_policy: if provided, transient errors (throttling, server errors) are retried
+        :param circuit_breaker: if provided, fail fast while provider is unhealthy
+                                (share it between clients of same host)
+        :param metrics: if provided, receives counters, and HTTP metrics if the session was created with
+                        its trace_config()
 
         If meter_id is None, it will be read from the web later.
         '''
@@ -51,6 +154,28 @@ class AsyncClient():
         self._id = meter_id
         self._client_session = session
         self._use_litre = use_litre
+        self._session_store = session_store
+        self._store = store
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_ttl > 0 else None
+        # telemetry requests in progress: key -> _SharedRequest of measures
+        self._telemetry_in_flight = {}
+        self._meter_list = None
+        self._meter_list_in_flight = None
+        # (meter_id, mode) -> aggregates updated on each request
+        self._analytics = {}
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._metrics = metrics
+        # session into which saved cookies were restored
+        self._restored_session = None
+        # incremented on each login, to detect logins done by concurrent tasks
+        self._login_generation = 0
+        self._saved_generation = 0
+        self._login_lock_loop = None
+        self._login_lock_object = None
+        self._counters = {'requests': 0, 'logins': 0, 'retries': 0, 'cache_hits': 0, 'cache_misses': 0, 'coalesced': 0,
+                          'login_page_bytes': 0, 'login_page_bytes_skipped': 0, 'compressed_bytes': 0, 'bytes_saved': 0}
         # base url contains the scheme, address and base path
         if url is None:
             self._provider_url = GENERIC_BASE_URL
@@ -65,6 +190,28 @@ class AsyncClient():
         '''
         return self._provider_name
 
+    def username(self) -> str:
+        '''
+        :returns: the account id
+        '''
+        return self._username
+
+    def counters(self) -> dict:
+        '''
+        :returns: number of HTTP requests, logins, retries, telemetry cache hits and misses,
+                  telemetry calls served by an identical request in progress, bytes of login pages read and skipped,
+                  and bytes of compressed API responses and saved by compression.
+        '''
+        return dict(self._counters)
+
+    def _count(self, name: str, value: int = 1) -> None:
+        '''
+        Add value to counter name, also in metrics if configured.
+        '''
+        self._counters[name] += value
+        if self._metrics is not None:
+            self._metrics.increment(name, value)
+
     def _full_url(self, endpoint: str) -> str:
         '''
         :returns: full URL by concatenating base URL and sub path
@@ -77,10 +224,7 @@ class AsyncClient():
         '''
         if volume_m3 is None:
             return METER_NO_VALUE
-        elif self._use_litre:
-            return int(1000 * volume_m3)
-        else:
-            return volume_m3
+        return _convert_volume(volume_m3, self._use_litre)
 
     def _is_valid_absolute(self, value) -> bool:
         '''
@@ -94,59 +238,166 @@ class AsyncClient():
         Clear login cookie to force logout and login next time.
         '''
         if self._client_session is not None:
-            self._client_session.cookie_jar.clear_domain(urlparse(self._api_base_url).netloc)
+            self._client_session.cookie_jar.clear_domain(urlparse(self._provider_url).netloc)
+        if self._session_store is not None:
+            self._session_store.clear(self._provider_url, self._username)
+
+    def _restore_session(self) -> None:
+        '''
+        Load saved login cookies into the current session, once per session.
+        '''
+        if self._session_store is None or self._restored_session is self._client_session:
+            return
+        self._restored_session = self._client_session
+        cookies = self._session_store.load(self._provider_url, self._username)
+        if cookies:
+            _LOGGER.debug('Restoring %d saved cookies', len(cookies))
+            self._client_session.cookie_jar.update_cookies(cookies, URL(self._provider_url))
+
+    def _save_session(self) -> None:
+        '''
+        Save login cookies of the current session, if a store is configured.
+        '''
+        if self._session_store is None:
+            return
+        cookies = self._client_session.cookie_jar.filter_cookies(URL(self._provider_url))
+        self._session_store.save(self._provider_url, self._username,
+                                 {name: morsel.value for name, morsel in cookies.items()})
 
     def _dump_cookie_jar(self, jar) -> None:
         _LOGGER.debug('Cookie jar:')
         for cookie in jar:
             _LOGGER.debug(f'Domain: %s, Name: %s = %s', cookie['domain'], cookie.key, cookie.value)
 
-    def _request(self, path: str, data=None, **kwargs: Any) -> aiohttp.ClientResponse:
+    def _request(self, path: str, data=None, **kwargs: Any) -> _GuardedRequest:
         '''
         Create a request context manager depending on presence of data: get or post
 
         If no session exists, create one
         '''
         if self._client_session is None:
-            self._client_session = aiohttp.ClientSession()
-        self._dump_cookie_jar(self._client_session.cookie_jar)
-        _LOGGER.debug('=====================================================')
+            trace_configs = None if self._metrics is None else [self._metrics.trace_config()]
+            self._client_session = aiohttp.ClientSession(trace_configs=trace_configs)
+        self._restore_session()
         full_url = self._full_url(path)
-        method = 'get'
-        if data is not None:
-            method = 'post'
-            _LOGGER.debug('Data: %s', data)
-        if 'params' in kwargs:
-            _LOGGER.debug('Params: %s', kwargs['params'])
-        _LOGGER.debug('Accessing: %s %s', method, full_url)
-        return self._client_session.request(
-            method=method,
-            url=full_url,
-            data=data,
-            **kwargs)
+        method = 'get' if data is None else 'post'
+        # skip debug-only work on the hot path
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            self._dump_cookie_jar(self._client_session.cookie_jar)
+            _LOGGER.debug('=====================================================')
+            if data is not None:
+                _LOGGER.debug('Data: %s', data)
+            if 'params' in kwargs:
+                _LOGGER.debug('Params: %s', kwargs['params'])
+            _LOGGER.debug('Accessing: %s %s', method, full_url)
+        return _GuardedRequest(self, method, full_url, dict(data=data, **kwargs))
+
+    async def _async_send(self, method: str, url: str, kwargs: dict) -> aiohttp.ClientResponse:
+        '''
+        Send the request, applying rate limiter, circuit breaker and retry policy if configured.
+
+        :returns: the response, to be released by caller
+        '''
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.before_request()
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+            self._count('requests')
+            retry_after = None
+            try:
+                response = await self._client_session.request(method=method, url=url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.record_failure()
+                if self._retry_policy is None or attempt >= self._retry_policy.attempts:
+                    raise
+                _LOGGER.debug('Request failed: %s', error)
+            else:
+                transient = response.status in (TRANSIENT_HTTP_STATUSES if self._retry_policy is None
+                                                else self._retry_policy.statuses)
+                if self._circuit_breaker is not None:
+                    if transient:
+                        self._circuit_breaker.record_failure()
+                    else:
+                        self._circuit_breaker.record_success()
+                if not transient or self._retry_policy is None or attempt >= self._retry_policy.attempts:
+                    return response
+                _LOGGER.debug('Transient HTTP error: %s', response.status)
+                retry_after = response.headers.get('Retry-After')
+                response.release()
+            delay = self._retry_policy.delay(attempt, retry_after)
+            _LOGGER.debug('Retrying in %.1fs', delay)
+            self._count('retries')
+            await asyncio.sleep(delay)
 
     def _validate_response(self, response: aiohttp.ClientResponse, success_code=200) -> None:
         '''
         Validate the response, raise an exception if not successful.
         '''
-        _LOGGER.debug('Request Cookie: %s', response.request_info.headers.get('Cookie'))
-        _LOGGER.debug('Response: %s', response)
-        for cookie in response.cookies:
-            _LOGGER.debug('Response Cookie: %s', cookie)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug('Request Cookie: %s', response.request_info.headers.get('Cookie'))
+            _LOGGER.debug('Response: %s', response)
+            for cookie in response.cookies:
+                _LOGGER.debug('Response Cookie: %s', cookie)
         if response.status != success_code:
             response.raise_for_status()
             raise ClientError(f'HTTP error {response.status} for {response.url}')
 
-    def _find_in_text(self, text: str, reg_ex: str, page: str) -> str:
+    async def _async_find_csrf_token(self, response: aiohttp.ClientResponse) -> bytes:
         '''
-        Find the specified regex in the text and return the first group.
-        '''
-        # get expected regex from page
-        matches = re.compile(reg_ex).search(text)
+        Read the login page until the CSRF token is found, the rest of the page is not downloaded.
+
+        :returns: the token, still escaped
+        '''
+        buffer = b''
+        size = 0
+        matches = None
+        async for chunk in response.content.iter_chunked(LOGIN_SCAN_CHUNK):
+            size += len(chunk)
+            buffer += chunk
+            matches = _CSRF_TOKEN_PATTERN.search(buffer)
+            if matches is None:
+                buffer = buffer[-LOGIN_SCAN_OVERLAP:]
+                continue
+            # the token cannot contain a comma: once one follows, the match cannot grow with next chunks
+            if b',' in buffer[matches.end():]:
+                break
+            buffer = buffer[matches.start():]
+            matches = None
+        else:
+            # end of page
+            matches = _CSRF_TOKEN_PATTERN.search(buffer)
+        self._count('login_page_bytes', size)
+        if self._metrics is not None:
+            # read by chunks: not seen by the trace config of metrics
+            self._metrics.increment('bytes_received', size)
+        if response.content_length is not None and 'Content-Encoding' not in response.headers:
+            self._count('login_page_bytes_skipped', response.content_length - size)
+        # drop the connection instead of reading the rest of the page
+        response.close()
         if matches is None:
-            raise ClientError(f'Could not find {reg_ex} in page {page}')
-        result = matches.group(1)
-        return result
+            raise ClientError(f'Could not find {CSRF_TOKEN_REGEX} in page {PAGE_LOGIN}')
+        return matches.group(1)
+
+    def _count_compression(self, response: aiohttp.ClientResponse, size: int) -> None:
+        '''
+        Count bytes saved by compression of response, if its size on the wire is known.
+
+        :param size: size of decoded body
+        '''
+        if 'Content-Encoding' in response.headers and response.content_length is not None:
+            self._count('compressed_bytes', response.content_length)
+            self._count('bytes_saved', size - response.content_length)
+
+    def _is_login_redirect(self, response: aiohttp.ClientResponse) -> bool:
+        '''
+        :returns: True if the response redirects to the login page (not logged in)
+        '''
+        return response.status in REDIRECT_HTTP_STATUSES and \
+            URL(response.headers.get('Location', '')).path.endswith(PAGE_LOGIN)
 
     async def _async_call_with_auth(self, endpoint, decode: bool = True, **kwargs: Any) -> Union[dict, str]:
         '''
@@ -158,56 +409,143 @@ class AsyncClient():
         :returns: the dict of result, or page
         '''
         _LOGGER.debug('Calling with auth: %s', endpoint)
-        # if first attempt fails, login, then try again
-        for attempt in range(1, 3):
-            async with self._request(path=endpoint, **kwargs) as response:
-                self._validate_response(response)
-                if not response.url.path.endswith(PAGE_LOGIN):
+        # if first attempt fails, login, then try again (once more if another login was done meanwhile)
+        for attempt in range(1, 4):
+            if self._login_lock().locked():
+                # wait for login in progress: a request sent without its cookies is only redirected to login page
+                async with self._login_lock():
+                    pass
+            # login done by any task after this point makes the request below obsolete
+            login_generation = self._login_generation
+            # redirect to login page is not followed: GET of that page can also reset the CSRF token of a login
+            # started meanwhile by another task
+            async with self._request(path=endpoint, allow_redirects=False, **kwargs) as response:
+                if not self._is_login_redirect(response):
+                    self._validate_response(response)
                     # success !
+                    if self._saved_generation != self._login_generation:
+                        # a new login was done: keep it for next time
+                        self._saved_generation = self._login_generation
+                        self._save_session()
                     if not decode:
                         return await response.text(encoding='utf-8')
                     if 'application/json' not in response.headers.get('content-type'):
                         raise ClientError('Failed getting data: not JSON content')
-                    result = await response.json()
+                    body = await response.read()
+                    self._count_compression(response, len(body))
+                    result = json.loads(body)
                     if isinstance(result, list) and len(result) == 2 and result[0] == 'ERR':
                         raise ClientError(f'API returned error: {result[1]}')
                     if isinstance(result, dict) and 'content' in result:
                         if result['content'] == None:
-                            raise ClientError(f'API returned error: {result['message']}')    
+                            raise ClientError(f'API returned error: {result["message"]}')
                         result=result['content']
                     _LOGGER.debug('Result: %s', result)
                     return result
-                # second attempt, after login failed
-                if attempt == 2:
+                # after login failed, unless another task logged in during this attempt
+                if attempt == 3 or (attempt == 2 and self._login_generation == login_generation):
                     raise ClientError(f'Login failed.')
-                # first attempt failed, so try to login
-                _LOGGER.debug(f'Redirected to {PAGE_LOGIN}, performing login...')
-                # step 1: GET login page, retrieve CSRF token
-                csrf_token = None
-                async with self._request(path=PAGE_LOGIN) as response:
-                    text = await response.text(encoding='utf-8')
-                    csrf_token = self._find_in_text(text, CSRF_TOKEN_REGEX, PAGE_LOGIN)
-                csrf_token = csrf_token.encode('utf-8').decode('unicode-escape')
-                _LOGGER.debug('Token: %s', csrf_token)
-                # step 2: POST credentials in login page
-                credential_data = {
-                    '_csrf_token': csrf_token,
-                    'tsme_user_login[_username]': self._username,
-                    'tsme_user_login[_password]': self._password,
-                    'tsme_user_login[_target_path]': PAGE_DASHBOARD,
-                }
-                # cookies are set in the session
+            # first attempt failed, so try to login
+            _LOGGER.debug(f'Redirected to {PAGE_LOGIN}, performing login...')
+            await self._async_login(login_generation)
+
+    def _login_lock(self) -> asyncio.Lock:
+        '''
+        :returns: the lock serializing logins, bound to the running event loop
+        '''
+        loop = asyncio.get_running_loop()
+        if self._login_lock_loop is not loop:
+            self._login_lock_loop = loop
+            self._login_lock_object = asyncio.Lock()
+        return self._login_lock_object
+
+    async def _async_login(self, login_generation: int) -> None:
+        '''
+        Login, unless another task already did since login_generation: then reuse its cookies.
+
+        :param login_generation: value of _login_generation when the caller sent its request
+        '''
+        async with self._login_lock():
+            if self._login_generation != login_generation:
+                _LOGGER.debug('Login already done by another task')
+                return
+            # step 1: GET login page, retrieve CSRF token
+            async with self._request(path=PAGE_LOGIN) as response:
+                csrf_token = (await self._async_find_csrf_token(response)).decode('unicode-escape')
+            _LOGGER.debug('Token: %s', csrf_token)
+            # step 2: POST credentials in login page
+            credential_data = {
+                '_csrf_token': csrf_token,
+                'tsme_user_login[_username]': self._username,
+                'tsme_user_login[_password]': self._password,
+                'tsme_user_login[_target_path]': PAGE_DASHBOARD,
+            }
+            # cookies are set in the session
+            try:
                 async with self._request(path=PAGE_LOGIN, data=credential_data, allow_redirects=True) as response:
                     self._validate_response(response)
+            finally:
+                # even if failed: waiting tasks must not retry with same credentials
+                self._login_generation += 1
+                self._count('logins')
 
-    async def async_meter_list(self) -> dict:
+    async def async_meter_list(self, refresh: bool = False) -> dict:
         '''
-        List of meters for the user.
+        List of meters for the user, read once per client (concurrent callers share the same request).
 
+        :param refresh: if True, read the list again from the web site (e.g. to see new meters)
         :returns: the list of meters associated to the calling user.
         '''
-        # ignore keys: code, message
-        return (await self._async_call_with_auth(API_ENDPOINT_METER_LIST))
+        if self._meter_list is None or refresh:
+            if self._meter_list_in_flight is None:
+                # own task: cancelling one caller does not cancel the request of the others
+                self._meter_list_in_flight = asyncio.ensure_future(self._async_request_meter_list())
+                self._meter_list_in_flight.add_done_callback(_retrieve_exception)
+            return await asyncio.shield(self._meter_list_in_flight)
+        return self._meter_list
+
+    async def _async_request_meter_list(self) -> dict:
+        '''
+        :returns: the list of meters read from the web site, also kept for next calls
+        '''
+        try:
+            # ignore keys: code, message
+            self._meter_list = await self._async_call_with_auth(API_ENDPOINT_METER_LIST)
+        finally:
+            self._meter_list_in_flight = None
+        return self._meter_list
+
+    async def async_meter_ids(self) -> List[str]:
+        '''
+        :returns: identifiers of all water meters of the account (idPDS)
+        '''
+        meter_list = await self.async_meter_list()
+        return [meter['idPDS'] for client in meter_list['clientCompteursPro'] for meter in client['compteursPro']]
+
+    async def async_for_all_meters(self, job: str, *args: Any, **kwargs: Any) -> dict:
+        '''
+        Call a method for each meter of the account, concurrently, with the same login.
+
+        :param job: name of a method accepting meter_id, without the async_ prefix (e.g. 'latest_reading')
+        :param args: additional arguments for the method
+        :returns: {meter_id: result} for each meter
+        '''
+        meter_ids = await self.async_meter_ids()
+        method = getattr(self, f'async_{job}')
+        results = await asyncio.gather(*[method(*args, meter_id=meter_id, **kwargs) for meter_id in meter_ids])
+        return dict(zip(meter_ids, results))
+
+    async def async_meters_summary(self) -> dict:
+        '''
+        Latest reading and monthly summary of all meters of the account, fetched concurrently.
+
+        :returns: {meter_id: {latest_reading:, monthly_recent:}} for each meter
+        '''
+        latest, monthly = await asyncio.gather(
+            self.async_for_all_meters('latest_reading'),
+            self.async_for_all_meters('monthly_recent'))
+        return {meter_id: {'latest_reading': latest[meter_id], 'monthly_recent': monthly[meter_id]}
+                for meter_id in latest}
 
     async def async_meter_id(self) -> str:
         '''
@@ -220,7 +558,8 @@ class AsyncClient():
             # Read meter ID
             meter_list = await self.async_meter_list()
             if meter_list['nbMeters'] != 1:
-                raise ClientError(f'Unexpected number of meters: {meter_list["nbMeters"]}')
+                raise ClientError(f'Unexpected number of meters: {meter_list["nbMeters"]}, '
+                                  'provide meter_id, or use async_for_all_meters')
             self._id = meter_list['clientCompteursPro'][0]['compteursPro'][0]['idPDS']
         return self._id
 
@@ -240,9 +579,10 @@ class AsyncClient():
             contract_list = list(filter(lambda c: c['isActif'], contract_list))
         return contract_list
 
-    async def async_daily_for_month(self, report_date: datetime.date) -> dict:
+    async def async_daily_for_month(self, report_date: datetime.date, meter_id: Optional[str] = None) -> dict:
         '''
         :param report_date: specify year/month for report, e.g. built with Date.new(year,month,1)
+        :param meter_id: meter to read, default: meter of the client
         :returns: [day_in_month]={day:, total:} daily usage for the specified month
         raise an exception if there is no data for that date
         '''
@@ -250,25 +590,20 @@ class AsyncClient():
             raise ClientError('Coding error: Provide a date object for report_date')
         first_day = report_date.replace(day=1)
         last_day = report_date.replace(day=calendar.monthrange(report_date.year, report_date.month)[1])
-        daily = await self.async_telemetry(mode='daily',date_begin= first_day, date_end=last_day)
+        daily = await self.async_telemetry_series(mode='daily', date_begin=first_day, date_end=last_day,
+                                                  meter_id=meter_id)
         # since the month is known, keep only day in result (avoid redundant information)
-        result = {
-            'daily': {},
-            'absolute': {}
-        }
-        for i in daily:
-            if self._is_valid_absolute(i['index']):
-                day_index = int(datetime.datetime.strptime(i['date'].split(' ')[0], '%Y-%m-%d').day)
-                result['daily'][day_index] = self._convert_volume(i['volume'])
-                result['absolute'][day_index] = self._convert_volume(i['index'])
+        result = daily.daily_view()
         _LOGGER.debug('daily_for_month: %s', result)
         return result
 
-    async def async_telemetry(self, mode: str, date_begin: datetime.date, date_end: datetime.date) -> dict:
+    async def async_telemetry(self, mode: str, date_begin: datetime.date, date_end: datetime.date,
+                              meter_id: Optional[str] = None) -> dict:
         '''
         :param mode: monthly or daily
         :param date_begin: date for start
         :param date_end: date for stop
+        :param meter_id: meter to read, default: meter of the client
         :returns: measures
         raise an exception if there is a problem
         '''
@@ -276,63 +611,262 @@ class AsyncClient():
             raise ClientError('Coding error: Provide a date object for date_begin')
         if not isinstance(date_end, datetime.date):
             raise ClientError('Coding error: Provide a date object for date_end')
+        if meter_id is None:
+            meter_id = await self.async_meter_id()
+        if self._store is None:
+            return await self._async_fetch_telemetry(meter_id, mode, date_begin, date_end)
+        await self.async_sync(mode, date_begin, date_end, meter_id=meter_id)
+        return self._store.measures(meter_id, mode, date_begin, date_end)
+
+    async def async_telemetry_series(self, mode: str, date_begin: datetime.date, date_end: datetime.date,
+                                     meter_id: Optional[str] = None) -> TelemetrySeries:
+        '''
+        Same as async_telemetry, but in compact columnar form.
+
+        :returns: measures as TelemetrySeries
+        '''
+        return TelemetrySeries.from_measures(
+            await self.async_telemetry(mode, date_begin, date_end, meter_id), mode, self._use_litre)
+
+    def _telemetry_chunks(self, date_begin: datetime.date, date_end: datetime.date,
+                          chunk: str) -> List[Tuple[datetime.date, datetime.date]]:
+        '''
+        :param chunk: month or year
+        :returns: list of (begin, end) covering the range, split on month or year boundaries
+        '''
+        result = []
+        begin = date_begin
+        while begin <= date_end:
+            if chunk == 'year':
+                end = datetime.date(begin.year, 12, 31)
+            elif chunk == 'month':
+                end = begin.replace(day=calendar.monthrange(begin.year, begin.month)[1])
+            else:
+                raise ClientError(f'Coding error: chunk shall be month or year, not {chunk}')
+            end = min(end, date_end)
+            result.append((begin, end))
+            begin = end + datetime.timedelta(days=1)
+        return result
+
+    async def async_iter_telemetry(self, mode: str, date_begin: datetime.date, date_end: datetime.date,
+                                   chunk: Optional[str] = None, prefetch: int = TELEMETRY_PREFETCH,
+                                   meter_id: Optional[str] = None) -> AsyncIterator[dict]:
+        '''
+        Iterate on measures of a long range, fetched by chunks.
+
+        :param mode: monthly or daily
+        :param date_begin: date for start
+        :param date_end: date for stop
+        :param chunk: month or year, default: month for daily, year for monthly
+        :param prefetch: number of chunks fetched in advance while the current one is consumed
+        :param meter_id: meter to read, default: meter of the client
+        :returns: async iterator on measures, in date order
+        '''
+        if not isinstance(date_begin, datetime.date):
+            raise ClientError('Coding error: Provide a date object for date_begin')
+        if not isinstance(date_end, datetime.date):
+            raise ClientError('Coding error: Provide a date object for date_end')
+        if chunk is None:
+            chunk = 'year' if mode == 'monthly' else 'month'
+        chunks = iter(self._telemetry_chunks(date_begin, date_end, chunk))
+        # resolve meter id once, before concurrent requests (logs in only if the meter id must be read)
+        if meter_id is None:
+            meter_id = await self.async_meter_id()
+        # at most prefetch + 1 chunks in memory
+        pending = collections.deque()
+
+        def schedule_next() -> None:
+            for chunk_begin, chunk_end in chunks:
+                pending.append(asyncio.ensure_future(
+                    self.async_telemetry(mode, chunk_begin, chunk_end, meter_id)))
+                return
+
+        try:
+            for _ in range(prefetch + 1):
+                schedule_next()
+            while pending:
+                measures = await pending.popleft()
+                schedule_next()
+                for measure in measures:
+                    yield measure
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _async_fetch_telemetry(self, meter_id: str, mode: str, date_begin: datetime.date,
+                                     date_end: datetime.date) -> list:
+        '''
+        :returns: measures, read from the memory cache, or from an identical request in progress, or from the provider
+        '''
+        key = (meter_id, mode, date_begin, date_end)
+        if self._cache is not None:
+            measures = self._cache.get(key)
+            if measures is not None:
+                self._count('cache_hits')
+                return list(measures)
+        in_flight = self._telemetry_in_flight.get(key)
+        if in_flight is None:
+            self._count('cache_misses')
+            in_flight = _SharedRequest(self._telemetry_in_flight, key, self._async_request_telemetry(key))
+        else:
+            self._count('coalesced')
+        return list(await in_flight.wait())
+
+    async def _async_request_telemetry(self, key: tuple) -> list:
+        '''
+        :param key: meter_id, mode, date_begin, date_end
+        :returns: measures from the provider, also put in the memory cache
+        '''
+        meter_id, mode, date_begin, date_end = key
         result = await self._async_call_with_auth(API_ENDPOINT_TELEMETRY, params = {
-            "id_PDS":await self.async_meter_id(),
+            "id_PDS": meter_id,
             "mode": mode,
             "start_date":date_begin.strftime("%Y-%m-%d"),
             "end_date":date_end.strftime("%Y-%m-%d"),
         })
-        return result['measures']
+        measures = result['measures']
+        if self._cache is not None:
+            self._cache.put(key, measures)
+        return measures
+
+    async def async_sync(self, mode: str = 'daily', date_begin: Optional[datetime.date] = None,
+                         date_end: Optional[datetime.date] = None, meter_id: Optional[str] = None) -> int:
+        '''
+        Fetch from provider only the dates missing in the store.
+
+        :param mode: monthly or daily
+        :param date_begin: date for start, default: beginning of stored range, or first day of last year
+        :param date_end: date for stop, default and at most: today
+        :param meter_id: meter to read, default: meter of the client
+        :returns: number of measures fetched, 0 if date_begin is after date_end (e.g. in the future)
+        '''
+        if self._store is None:
+            raise ClientError('Coding error: no store configured')
+        if meter_id is None:
+            meter_id = await self.async_meter_id()
+        # there is no value in the future
+        today = datetime.date.today()
+        if date_end is None or date_end > today:
+            date_end = today
+        if date_begin is None:
+            coverage = self._store.coverage(meter_id, mode)
+            if coverage is None:
+                date_begin = datetime.date(date_end.year - 1, 1, 1)
+            else:
+                date_begin = min(coverage[0], date_end)
+        if date_begin > date_end:
+            # range entirely in the future
+            return 0
+        fetched = 0
+        for range_begin, range_end in self._store.missing_ranges(meter_id, mode, date_begin, date_end):
+            _LOGGER.debug('Fetching missing %s range: %s..%s', mode, range_begin, range_end)
+            measures = await self._async_fetch_telemetry(meter_id, mode, range_begin, range_end)
+            self._store.add(meter_id, mode, range_begin, range_end, measures)
+            fetched += len(measures)
+        return fetched
 
-    async def async_monthly_recent(self) -> dict:
+    async def async_monthly_recent(self, meter_id: Optional[str] = None) -> dict:
         '''
+        :param meter_id: meter to read, default: meter of the client
         :returns: [Hash] current month
         '''
         today = datetime.date.today()
         first_day_last_year = datetime.date(today.year - 1, 1, 1)
-        monthly = await self.async_telemetry(mode='monthly',date_begin= first_day_last_year, date_end=today)
-        result = {
-            'highest_monthly_volume': 'todo',
-            'last_year_volume': 'todo',
-            'this_year_volume': 'todo',
-            'monthly': {},
-            'absolute': {}
-        }
-        # fill monthly by year and month, we assume values are in date order
-        for i in monthly:
-            # skip values in the future... (meter value is set to zero if there is no reading for future values)
-            if self._is_valid_absolute(i['index']):
-                date = datetime.datetime.strptime(i['date'].split(' ')[0], '%Y-%m-%d')
-                year = date.year
-                if year not in result['monthly']:
-                    result['monthly'][year] = {}
-                    result['absolute'][year] = {}
-                month_index = date.month
-                result['monthly'][year][month_index] = self._convert_volume(i['volume'])
-                result['absolute'][year][month_index] = self._convert_volume(i['index'])
+        if meter_id is None:
+            meter_id = await self.async_meter_id()
+        monthly = await self.async_telemetry_series(mode='monthly', date_begin=first_day_last_year, date_end=today,
+                                                    meter_id=meter_id)
+        analytics = self._meter_analytics(meter_id, 'monthly')
+        analytics.update(monthly)
+        result = analytics.summary(today)
+        # fill monthly by year and month, values in the future are skipped (no meter reading)
+        result.update(monthly.monthly_view())
         return result
 
-    async def async_latest_meter_reading(self, what='absolute', month_data=None) -> Union[float, int]:
+    def _meter_analytics(self, meter_id: str, mode: str) -> TelemetryAnalytics:
         '''
+        :returns: aggregates of the meter in this mode, created on first use
+        '''
+        key = (meter_id, mode)
+        if key not in self._analytics:
+            self._analytics[key] = TelemetryAnalytics(mode, self._use_litre)
+        return self._analytics[key]
+
+    async def async_analytics(self, date_begin: Optional[datetime.date] = None,
+                              meter_id: Optional[str] = None) -> dict:
+        '''
+        Aggregates of daily telemetry: yearly volumes, rolling averages, leak (continuous flow) detection.
+
+        First call reads history from date_begin, next ones only the days after the latest one already read.
+
+        :param date_begin: start of history, default: first day of last year
+        :param meter_id: meter to read, default: meter of the client
+        :returns: see TelemetryAnalytics.summary
+        '''
+        if meter_id is None:
+            meter_id = await self.async_meter_id()
+        today = datetime.date.today()
+        analytics = self._meter_analytics(meter_id, 'daily')
+        if analytics.last_date is not None:
+            date_begin = analytics.last_date
+        elif date_begin is None:
+            date_begin = datetime.date(today.year - 1, 1, 1)
+        analytics.update(await self.async_telemetry_series(
+            mode='daily', date_begin=date_begin, date_end=today, meter_id=meter_id))
+        return analytics.summary(today)
+
+    async def async_latest_meter_reading(self, what='absolute', month_data=None,
+                                         previous_month_data=None, meter_id: Optional[str] = None) -> Union[float, int]:
+        '''
+        :param what: absolute or daily
+        :param month_data: result of async_daily_for_month for current month, if already available
+        :param previous_month_data: result of async_daily_for_month for previous month, if already available
+        :param meter_id: meter to read, default: meter of the client (month data provided must be of that meter)
         :returns: the latest meter reading
+
+        If month_data is not provided, only the last days are requested (see async_latest_reading).
         '''
+        if month_data is None:
+            return await self.async_latest_reading(what, meter_id=meter_id)
         reading_date = datetime.date.today()
         # latest available value may be yesterday or the day before
         for _ in range(METER_RETRIEVAL_MAX_DAYS_BACK):
             test_day = reading_date.day
             _LOGGER.debug('Trying day: %d', test_day)
-            try:
-                if month_data is None:
-                    month_data = await self.async_daily_for_month(reading_date)
-                if test_day in month_data[what]:
-                    return {'date': reading_date, 'volume': month_data[what][test_day]}
-            except Exception as error:
-                _LOGGER.debug('Error getting month data: %s', error)
+            if month_data is None:
+                month_data = await self.async_daily_for_month(reading_date, meter_id=meter_id)
+            if test_day in month_data[what]:
+                return {'date': reading_date, 'volume': month_data[what][test_day]}
             reading_date = reading_date - datetime.timedelta(days=1)
             if reading_date.day > test_day:
-                month_data = None
+                month_data = previous_month_data
+                previous_month_data = None
         raise ClientError(f'Cannot get latest meter value in the last {METER_RETRIEVAL_MAX_DAYS_BACK} days')
 
+    async def async_latest_reading(self, what: str = 'absolute', days_back: int = METER_RETRIEVAL_MAX_DAYS_BACK,
+                                   meter_id: Optional[str] = None) -> dict:
+        '''
+        Latest meter reading, with a single telemetry request on the last days
+        (served from store or cache if configured).
+
+        :param what: absolute or daily
+        :param days_back: number of days to look back
+        :param meter_id: meter to read, default: meter of the client
+        :returns: {date:, volume:} of the newest valid meter reading
+        raise an exception if there is a problem or no reading in that period
+        '''
+        if what not in ['absolute', 'daily']:
+            raise ClientError(f'Coding error: what shall be absolute or daily, not {what}')
+        today = datetime.date.today()
+        series = (await self.async_telemetry_series(
+            mode='daily', date_begin=today - datetime.timedelta(days=days_back), date_end=today,
+            meter_id=meter_id)).valid()
+        if len(series) == 0:
+            raise ClientError(f'Cannot get latest meter value in the last {days_back} days')
+        newest = max(range(len(series)), key=series.dates.__getitem__)
+        values = series.indexes if what == 'absolute' else series.volumes
+        return {'date': series.date(newest), 'volume': self._convert_volume(values[newest])}
+
     async def async_check_credentials(self) -> bool:
         '''
         :returns: True if credentials are valid
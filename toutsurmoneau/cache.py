@@ -0,0 +1,52 @@
+import collections
+import time
+from typing import Any, Hashable
+
+
+class TTLCache():
+    '''
+    Bounded cache: entries expire after a time to live, least recently used entries are evicted first.
+    '''
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0) -> None:
+        '''
+        :param maxsize: maximum number of entries
+        :param ttl: time to live of entries, in seconds
+        '''
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self._maxsize = maxsize
+        self._ttl = ttl
+        # key -> (expiry, value), in order of use
+        self._entries = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        '''
+        :returns: value for key, or default if not present or expired
+        '''
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        '''
+        Add or replace the value for key, evicting the least recently used entry if full.
+        '''
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        '''
+        Remove all entries.
+        '''
+        self._entries.clear()
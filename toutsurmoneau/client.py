@@ -1,9 +1,12 @@
 import asyncio
 import aiohttp
 import datetime
+import threading
 from typing import Optional, Union
 from .errors import ClientError
 from .async_client import AsyncClient
+from .session_store import SessionStore
+from .store import TelemetryStore
 
 
 class Client():
@@ -12,7 +15,9 @@ class Client():
     Legacy synchronous client.
     '''
 
-    def __init__(self, username, password: str, meter_id: Optional[str] = None, provider: Optional[str] = None, session=None, timeout=None):
+    def __init__(self, username, password: str, meter_id: Optional[str] = None, provider: Optional[str] = None, session=None, timeout=None,
+                 session_store: Optional[SessionStore] = None, store: Optional[TelemetryStore] = None,
+                 persistent: bool = False):
         '''
         Initialize the client object.
 
@@ -24,6 +29,10 @@ class Client():
         :param provider: name of provider from PROVIDER_URLS, or URL of provider
         :param session: an HTTP session (not used)
         :param timeout: HTTP timeout (not used)
+        :param session_store: if provided, login is kept across calls and processes
+        :param store: if provided, telemetry is kept locally and only missing dates are fetched
+        :param persistent: if True, keep an event loop thread and one HTTP session (connections and login)
+                           until close_session() is called, else a new one is created on each call
         '''
         # updated when update() is called
         self.attributes = {}
@@ -33,53 +42,97 @@ class Client():
         self.success = True
         # Legacy, not used:
         self.data = {}
+        self._persistent = persistent
+        # event loop running in background thread, in persistent mode
+        self._loop = None
+        self._thread = None
         self._async_client = AsyncClient(
             username=username,
             password=password,
             session=None,
             meter_id=meter_id,
             url=provider,
-            use_litre=True)
+            use_litre=True,
+            session_store=session_store,
+            store=store)
+
+    def _run(self, coroutine):
+        '''
+        Run the coroutine to completion, in the background loop if persistent.
+        '''
+        if not self._persistent:
+            return asyncio.run(main=coroutine)
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='toutsurmoneau', daemon=True)
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
 
     async def _async_task(self, check_only: bool = False):
         '''
-        Open a session and call the async client.
+        Open a session (unless persistent) and call the async client.
         '''
+        if self._persistent:
+            # session is created on first use, and kept
+            return await self._async_collect(check_only)
         async with aiohttp.ClientSession() as session:
             # using this session will auto-close
             self._async_client._client_session = session
-            if check_only:
-                return await self._async_client.async_check_credentials()
-            self.attributes['attribution'] = f"Data provided by {self._async_client.provider_name()}"
-            summary = await self._async_client.async_monthly_recent()
-            self.attributes['lastYearOverAll'] = summary['last_year_volume']
-            self.attributes['thisYearOverAll'] = summary['this_year_volume']
-            self.attributes['highestMonthlyConsumption'] = summary['highest_monthly_volume']
-            self.attributes['history'] = summary['monthly']
-            today = datetime.date.today()
-            self.attributes['thisMonthConsumption'] = await self._async_client.async_daily_for_month(today)
-            if today.month == 1:
-                last_month = datetime.date(today.year - 1, 12, 1)
-            else:
-                last_month = datetime.date(today.year, today.month - 1, 1)
-            self.attributes['previousMonthConsumption'] = await self._async_client.async_daily_for_month(last_month)
-            self.state = (await self._async_client.async_latest_meter_reading('daily', self.attributes['thisMonthConsumption']))['volume']
+            return await self._async_collect(check_only)
+
+    async def _async_collect(self, check_only: bool):
+        '''
+        Call the async client.
+        '''
+        if check_only:
+            return await self._async_client.async_check_credentials()
+        self.attributes['attribution'] = f"Data provided by {self._async_client.provider_name()}"
+        # read meter id once, before concurrent requests (logs in if needed): when meter id is known, login is done
+        # by the first request that needs it, the others wait for it (see AsyncClient._async_login)
+        await self._async_client.async_meter_id()
+        today = datetime.date.today()
+        if today.month == 1:
+            last_month = datetime.date(today.year - 1, 12, 1)
+        else:
+            last_month = datetime.date(today.year, today.month - 1, 1)
+        summary, this_month, previous_month = await asyncio.gather(
+            self._async_client.async_monthly_recent(),
+            self._async_client.async_daily_for_month(today),
+            self._async_client.async_daily_for_month(last_month))
+        self.attributes['lastYearOverAll'] = summary['last_year_volume']
+        self.attributes['thisYearOverAll'] = summary['this_year_volume']
+        self.attributes['highestMonthlyConsumption'] = summary['highest_monthly_volume']
+        self.attributes['history'] = summary['monthly']
+        self.attributes['thisMonthConsumption'] = this_month
+        self.attributes['previousMonthConsumption'] = previous_month
+        self.state = (await self._async_client.async_latest_meter_reading(
+            'daily', this_month, previous_month))['volume']
 
     def check_credentials(self) -> bool:
         '''
         :returns: True if credentials are valid
         '''
-        return asyncio.run(main=self._async_task(True))
+        return self._run(self._async_task(True))
 
     def update(self) -> dict:
         '''
         :returns: a summary of collected data.
         '''
-        asyncio.run(main=self._async_task())
+        self._run(self._async_task())
         return self.attributes
 
     def close_session(self) -> None:
         '''
-        Close current session.
+        Close current session, and stop background loop if persistent.
         '''
-        pass
+        if self._loop is None:
+            return
+        session = self._async_client._client_session
+        if session is not None:
+            asyncio.run_coroutine_threadsafe(session.close(), self._loop).result()
+            self._async_client._client_session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
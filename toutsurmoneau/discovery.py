@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Optional, Sequence
+import aiohttp
+from .async_client import AsyncClient
+from .const import KNOWN_PROVIDER_URLS
+from .session_store import write_private_json
+
+_LOGGER = logging.getLogger(__name__)
+
+# seconds allowed to each provider to answer the login sequence
+DISCOVERY_TIMEOUT = 10.0
+
+
+class ProviderCache():
+    '''
+    Persist on disk the provider URL found for each account, so that discovery runs once.
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''
+        :param path: path of the JSON file holding the mapping, created on first save
+        '''
+        self._path = os.path.expanduser(path)
+
+    def _key(self, username: str) -> str:
+        '''
+        :returns: key of the account: usernames are not stored in clear
+        '''
+        return hashlib.sha256(username.encode('utf-8')).hexdigest()
+
+    def _read(self) -> dict:
+        '''
+        :returns: the mapping in file, empty if file does not exist or is not readable
+        '''
+        try:
+            with open(self._path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            _LOGGER.debug('Ignoring provider file %s: %s', self._path, error)
+            return {}
+
+    def get(self, username: str) -> Optional[str]:
+        '''
+        :returns: the provider URL of the account, None if unknown
+        '''
+        return self._read().get(self._key(username))
+
+    def set(self, username: str, url: str) -> None:
+        '''
+        Save the provider URL of the account.
+        '''
+        mapping = self._read()
+        mapping[self._key(username)] = url
+        write_private_json(self._path, mapping)
+
+    def clear(self, username: str) -> None:
+        '''
+        Forget the provider of the account.
+        '''
+        mapping = self._read()
+        if mapping.pop(self._key(username), None) is not None:
+            write_private_json(self._path, mapping)
+
+
+async def _async_probe(username: str, password: str, url: str, session: aiohttp.ClientSession,
+                       timeout: float) -> Optional[str]:
+    '''
+    :returns: url if the credentials are valid on this provider, else None
+    '''
+    client = AsyncClient(username, password, url=url, session=session)
+    try:
+        if await asyncio.wait_for(client.async_check_credentials(), timeout):
+            return url
+    except asyncio.TimeoutError:
+        _LOGGER.debug('No answer from %s within %ss', url, timeout)
+    return None
+
+
+async def async_discover_provider(username: str, password: str, urls: Sequence[str] = KNOWN_PROVIDER_URLS,
+                                  session: Optional[aiohttp.ClientSession] = None,
+                                  timeout: float = DISCOVERY_TIMEOUT,
+                                  cache: Optional[ProviderCache] = None) -> Optional[str]:
+    '''
+    Find the provider of an account: login is tried on all providers concurrently,
+    remaining attempts are cancelled as soon as one succeeds.
+
+    :param urls: candidate provider URLs
+    :param session: an HTTP session, default: a temporary one
+    :param timeout: seconds allowed to each provider
+    :param cache: if provided, a known provider is returned without network access, and a found one is saved
+    :returns: URL of the provider, or None if login failed everywhere
+    '''
+    if cache is not None:
+        url = cache.get(username)
+        if url is not None:
+            _LOGGER.debug('Provider of %s from cache: %s', username, url)
+            return url
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await async_discover_provider(username, password, urls, session, timeout, cache)
+    pending = {asyncio.ensure_future(_async_probe(username, password, url, session, timeout)) for url in urls}
+    found = None
+    try:
+        while pending and found is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result() is not None:
+                    found = task.result()
+                    break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+    if found is not None and cache is not None:
+        cache.set(username, found)
+    _LOGGER.debug('Provider of %s: %s', username, found)
+    return found
@@ -6,3 +6,10 @@ class ClientError(Exception):
     Raised when a problem occurs while calling the API.
     '''
     pass
+
+
+class CircuitOpenError(ClientError):
+    '''
+    Raised when a request is refused because the provider is considered unavailable.
+    '''
+    pass
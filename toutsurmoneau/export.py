@@ -0,0 +1,79 @@
+import csv
+import datetime
+import json
+from typing import Optional, TextIO, TYPE_CHECKING
+if TYPE_CHECKING:
+    from .async_client import AsyncClient
+
+# supported export formats
+EXPORT_FORMATS = ['jsonl', 'csv', 'yaml']
+# columns of exported rows
+EXPORT_FIELDS = ['username', 'meter', 'mode', 'date', 'volume', 'index']
+
+
+class _JsonLinesWriter():
+    def __init__(self, file: TextIO) -> None:
+        self._file = file
+
+    def write(self, row: dict) -> None:
+        self._file.write(json.dumps(row))
+        self._file.write('\n')
+
+
+class _CsvWriter():
+    def __init__(self, file: TextIO) -> None:
+        self._writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        self._writer.writerow(row)
+
+
+class _YamlWriter():
+    def __init__(self, file: TextIO) -> None:
+        import yaml
+        self._yaml = yaml
+        self._file = file
+
+    def write(self, row: dict) -> None:
+        # one item of a top level list per row
+        self._yaml.safe_dump([row], self._file, sort_keys=False)
+
+
+def telemetry_writer(format: str, file: TextIO):
+    '''
+    :param format: one of EXPORT_FORMATS
+    :param file: where rows are written
+    :returns: an object with a write(row) method, writing rows as they come
+    '''
+    if format == 'jsonl':
+        return _JsonLinesWriter(file)
+    if format == 'csv':
+        return _CsvWriter(file)
+    if format == 'yaml':
+        return _YamlWriter(file)
+    raise ValueError(f'Unknown format: {format}, use one of: {", ".join(EXPORT_FORMATS)}')
+
+
+async def async_export_telemetry(client: 'AsyncClient', writer, mode: str, date_begin: datetime.date,
+                                 date_end: datetime.date, username: Optional[str] = None) -> int:
+    '''
+    Write telemetry of the client's meter, chunk by chunk as they arrive.
+
+    :param writer: as returned by telemetry_writer
+    :param username: value of column username
+    :returns: number of rows written
+    '''
+    meter = await client.async_meter_id()
+    count = 0
+    async for measure in client.async_iter_telemetry(mode, date_begin, date_end):
+        writer.write({
+            'username': username,
+            'meter': meter,
+            'mode': mode,
+            'date': measure['date'].split(' ')[0],
+            'volume': measure['volume'],
+            'index': measure['index'],
+        })
+        count += 1
+    return count
@@ -0,0 +1,220 @@
+import asyncio
+import csv
+import logging
+from typing import Optional, Any, List, NamedTuple, Callable, Awaitable, Union, AsyncIterator
+from urllib.parse import urlparse
+from .async_client import AsyncClient, GENERIC_BASE_URL
+from .metrics import Metrics
+from .pool import ConnectionPool
+from .session_store import SessionStore
+from .store import TelemetryStore
+from .resilience import RateLimiter, RetryPolicy, CircuitBreaker
+
+_LOGGER = logging.getLogger(__name__)
+# default maximum number of accounts processed at the same time
+FLEET_MAX_CONCURRENCY = 20
+# default maximum number of accounts processed at the same time on one provider host
+FLEET_MAX_PER_HOST = 4
+
+
+class FleetAccount(NamedTuple):
+    '''
+    Credentials and parameters of one account of the fleet.
+    '''
+    username: str
+    password: str
+    meter_id: Optional[str] = None
+    url: Optional[str] = None
+
+
+class FleetResult(NamedTuple):
+    '''
+    Outcome of a job on one account: either data or error is set.
+    '''
+    index: int
+    account: FleetAccount
+    data: Any = None
+    error: Optional[BaseException] = None
+
+
+def read_accounts(path: str) -> List[FleetAccount]:
+    '''
+    Read accounts from a CSV file: username,password[,meter_id[,url]]
+
+    Empty lines and lines starting with # are ignored, empty fields are None.
+    '''
+    accounts = []
+    with open(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        for fields in reader:
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) < 2 or len(fields) > 4:
+                # fields are not reported: they contain the password
+                raise ValueError(f'Expecting username,password[,meter_id[,url]] in {path}, line {reader.line_num}')
+            accounts.append(FleetAccount(*[field.strip() or None for field in fields]))
+    return accounts
+
+
+class AsyncFleet():
+    '''
+    Run the same AsyncClient call on many accounts concurrently, with bounded parallelism.
+    '''
+
+    def __init__(self, accounts: List[FleetAccount], max_concurrency: int = FLEET_MAX_CONCURRENCY,
+                 max_per_host: int = FLEET_MAX_PER_HOST, use_litre: bool = True,
+                 rate_limit: Optional[float] = None, retry_policy: Optional[RetryPolicy] = None,
+                 failure_threshold: Optional[int] = None, metrics: Optional[Metrics] = None,
+                 pool: Optional[ConnectionPool] = None, session_store: Optional[SessionStore] = None,
+                 store: Optional[TelemetryStore] = None) -> None:
+        '''
+        Initialize the fleet but no network connection is made.
+
+        :param accounts: list of FleetAccount (or tuples: username, password, meter_id, url)
+        :param max_concurrency: maximum number of accounts processed at the same time
+        :param max_per_host: maximum number of accounts processed at the same time on one provider host
+        :param use_litre: use Litre a unit if True, else use api native unit (cubic meter)
+        :param rate_limit: if provided, maximum number of requests per second on one provider host
+        :param retry_policy: if provided, transient errors are retried
+        :param failure_threshold: if provided, consecutive failures after which a provider host is not called
+                                  for a while
+        :param metrics: if provided, collects metrics of all accounts
+        :param pool: connections shared by accounts (each has its own cookies), default: a pool owned by the fleet
+        :param session_store: if provided, login cookies of accounts are restored from and saved to it
+        :param store: if provided, telemetry of accounts is kept in it and only missing dates are fetched
+        '''
+        if max_concurrency < 1 or max_per_host < 1:
+            raise ValueError('Concurrency limits must be at least 1')
+        self._accounts = [FleetAccount(*account) for account in accounts]
+        self._max_concurrency = max_concurrency
+        self._max_per_host = max_per_host
+        self._use_litre = use_litre
+        self._rate_limit = rate_limit
+        self._retry_policy = retry_policy
+        self._failure_threshold = failure_threshold
+        self._metrics = metrics
+        self._session_store = session_store
+        self._store = store
+        self._own_pool = pool is None
+        self._pool = ConnectionPool() if pool is None else pool
+        # host -> rate limiter and circuit breaker shared by clients of that host
+        self._rate_limiters = {}
+        self._circuit_breakers = {}
+        # one client (and one session, i.e. cookie jar, on the shared pool) per account, kept to reuse login
+        self._clients = {}
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    @property
+    def accounts(self) -> List[FleetAccount]:
+        '''
+        :returns: the accounts of the fleet
+        '''
+        return self._accounts
+
+    async def __aenter__(self) -> 'AsyncFleet':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        '''
+        Close sessions of all accounts, and connections if the pool is owned by the fleet.
+        '''
+        clients = list(self._clients.values())
+        self._clients = {}
+        for client in clients:
+            await client._client_session.close()
+        if self._own_pool:
+            await self._pool.close()
+
+    def _client(self, index: int) -> AsyncClient:
+        '''
+        :returns: the client for the account at index, created on first use
+        '''
+        if index not in self._clients:
+            account = self._accounts[index]
+            host = self._host(account)
+            if self._rate_limit is not None and host not in self._rate_limiters:
+                self._rate_limiters[host] = RateLimiter(self._rate_limit)
+            if self._failure_threshold is not None and host not in self._circuit_breakers:
+                self._circuit_breakers[host] = CircuitBreaker(self._failure_threshold)
+            self._clients[index] = self._pool.client(
+                username=account.username,
+                password=account.password,
+                meter_id=account.meter_id,
+                url=account.url,
+                use_litre=self._use_litre,
+                rate_limiter=self._rate_limiters.get(host),
+                retry_policy=self._retry_policy,
+                circuit_breaker=self._circuit_breakers.get(host),
+                metrics=self._metrics,
+                session_store=self._session_store,
+                store=self._store)
+        return self._clients[index]
+
+    def _host(self, account: FleetAccount) -> str:
+        '''
+        :returns: the provider host of the account
+        '''
+        return urlparse(account.url or GENERIC_BASE_URL).netloc
+
+    def _host_semaphore(self, account: FleetAccount) -> asyncio.Semaphore:
+        '''
+        :returns: the semaphore limiting concurrency on the provider host of the account
+        '''
+        host = self._host(account)
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self._max_per_host)
+        return self._host_semaphores[host]
+
+    async def _async_run_one(self, index: int, job: Union[str, Callable[..., Awaitable]], *args: Any) -> FleetResult:
+        '''
+        Run the job on one account, never raises: errors are returned in the result.
+        '''
+        account = self._accounts[index]
+        try:
+            # host first, so that waiting for a busy host does not hold a global slot
+            async with self._host_semaphore(account):
+                async with self._semaphore:
+                    client = self._client(index)
+                    if isinstance(job, str):
+                        data = await getattr(client, f'async_{job}')(*args)
+                    else:
+                        data = await job(client, *args)
+            return FleetResult(index=index, account=account, data=data)
+        except Exception as error:
+            _LOGGER.debug('Account %s failed: %s', account.username, error)
+            return FleetResult(index=index, account=account, error=error)
+
+    async def as_completed(self, job: Union[str, Callable[..., Awaitable]], *args: Any) -> AsyncIterator[FleetResult]:
+        '''
+        Run the job on all accounts, and yield results as they finish.
+
+        :param job: name of an AsyncClient method without the async_ prefix (e.g. 'latest_meter_reading'),
+                    or a coroutine function called with the client as first argument.
+        :param args: additional arguments for the job
+        :returns: an async iterator on FleetResult, in order of completion
+        '''
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        tasks = [asyncio.ensure_future(self._async_run_one(index, job, *args))
+                 for index in range(len(self._accounts))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def async_run(self, job: Union[str, Callable[..., Awaitable]], *args: Any) -> List[FleetResult]:
+        '''
+        Run the job on all accounts, and wait for all of them.
+
+        :returns: list of FleetResult, in the order of accounts
+        '''
+        results = [None] * len(self._accounts)
+        async for result in self.as_completed(job, *args):
+            results[result.index] = result
+        return results
@@ -0,0 +1,107 @@
+import aiohttp
+import asyncio
+import bisect
+from typing import Sequence
+
+# upper bounds of latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics():
+    '''
+    Collect request metrics: latency histogram per endpoint, redirects, bytes received (decoded bodies read,
+    except bodies of redirects), errors, and counters reported by AsyncClient (logins, retries, cache hits...).
+
+    HTTP metrics are collected through an aiohttp TraceConfig, see trace_config().
+    '''
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        '''
+        :param buckets: upper bounds of latency histogram buckets, in seconds
+        '''
+        self._buckets = tuple(sorted(buckets))
+        self._counters = {}
+        # endpoint -> {'count', 'sum', 'buckets': non-cumulative counts, last one is +Inf}
+        self._latency = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        '''
+        Add value to counter name.
+        '''
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        '''
+        Add a latency sample for endpoint.
+        '''
+        histogram = self._latency.get(endpoint)
+        if histogram is None:
+            histogram = self._latency[endpoint] = {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(self._buckets) + 1)}
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+        histogram['buckets'][bisect.bisect_left(self._buckets, seconds)] += 1
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        '''
+        :returns: a TraceConfig to provide to aiohttp.ClientSession, feeding this object
+        '''
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_redirect.append(self._on_request_redirect)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        trace_config.on_response_chunk_received.append(self._on_response_chunk_received)
+        return trace_config
+
+    async def _on_request_start(self, session, context, params) -> None:
+        context.start = asyncio.get_running_loop().time()
+        context.endpoint = params.url.path
+
+    async def _on_request_redirect(self, session, context, params) -> None:
+        self.increment('redirects')
+
+    async def _on_request_end(self, session, context, params) -> None:
+        self.observe(context.endpoint, asyncio.get_running_loop().time() - context.start)
+
+    async def _on_request_exception(self, session, context, params) -> None:
+        self.increment('request_errors')
+
+    async def _on_response_chunk_received(self, session, context, params) -> None:
+        # bodies read at once (API responses); login pages are added by AsyncClient, bodies of redirects
+        # released unread are not counted
+        self.increment('bytes_received', len(params.chunk))
+
+    def as_dict(self) -> dict:
+        '''
+        :returns: counters, and latency histograms per endpoint with cumulative buckets
+        '''
+        latency = {}
+        for endpoint, histogram in self._latency.items():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self._buckets + (float('inf'),), histogram['buckets']):
+                cumulative += count
+                buckets[bound] = cumulative
+            latency[endpoint] = {'count': histogram['count'], 'sum': histogram['sum'], 'buckets': buckets}
+        return {'counters': dict(self._counters), 'latency': latency}
+
+    def to_prometheus(self, prefix: str = 'toutsurmoneau') -> str:
+        '''
+        :returns: metrics in Prometheus text exposition format
+        '''
+        lines = []
+        metrics = self.as_dict()
+        for name, value in sorted(metrics['counters'].items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {value}')
+        if metrics['latency']:
+            name = f'{prefix}_request_duration_seconds'
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, histogram in sorted(metrics['latency'].items()):
+                label = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+                for bound, count in histogram['buckets'].items():
+                    bound_text = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{endpoint="{label}",le="{bound_text}"}} {count}')
+                lines.append(f'{name}_sum{{endpoint="{label}"}} {histogram["sum"]}')
+                lines.append(f'{name}_count{{endpoint="{label}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,84 @@
+import aiohttp
+import logging
+from typing import Optional, List, Any
+from .async_client import AsyncClient
+
+_LOGGER = logging.getLogger(__name__)
+# default maximum number of open connections, all hosts
+POOL_LIMIT = 100
+# default maximum number of open connections to one provider host
+POOL_LIMIT_PER_HOST = 8
+# seconds during which DNS resolutions are reused
+POOL_DNS_TTL = 300
+# seconds during which an idle connection is kept open for reuse
+POOL_KEEPALIVE_TIMEOUT = 30.0
+
+
+class ConnectionPool():
+    '''
+    Connections shared by the clients of many accounts.
+
+    All sessions created by the pool use the same connector (keep-alive connections and DNS cache per host),
+    but each session has its own cookie jar, so that logins of accounts stay separate.
+    '''
+
+    def __init__(self, limit: int = POOL_LIMIT, limit_per_host: int = POOL_LIMIT_PER_HOST,
+                 dns_ttl: Optional[int] = POOL_DNS_TTL, keepalive_timeout: float = POOL_KEEPALIVE_TIMEOUT) -> None:
+        '''
+        Initialize the pool but no network connection is made.
+
+        :param limit: maximum number of open connections, all hosts
+        :param limit_per_host: maximum number of open connections to one host
+        :param dns_ttl: seconds during which DNS resolutions are reused, None for ever
+        :param keepalive_timeout: seconds during which an idle connection is kept open
+        '''
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._dns_ttl = dns_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._connector = None
+
+    async def __aenter__(self) -> 'ConnectionPool':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @property
+    def connector(self) -> aiohttp.TCPConnector:
+        '''
+        :returns: the shared connector, created on first use (needs a running event loop)
+        '''
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                ttl_dns_cache=self._dns_ttl,
+                keepalive_timeout=self._keepalive_timeout)
+        return self._connector
+
+    def session(self, trace_configs: Optional[List[aiohttp.TraceConfig]] = None) -> aiohttp.ClientSession:
+        '''
+        :param trace_configs: trace configurations of the session, e.g. Metrics.trace_config()
+        :returns: a new session with its own cookie jar, using the shared connections
+        '''
+        return aiohttp.ClientSession(connector=self.connector, connector_owner=False,
+                                     cookie_jar=aiohttp.CookieJar(), trace_configs=trace_configs)
+
+    def client(self, username: str, password: str, **kwargs: Any) -> AsyncClient:
+        '''
+        :param kwargs: other parameters of AsyncClient, except session
+        :returns: a client of the account, with its own session in the pool
+        '''
+        metrics = kwargs.get('metrics')
+        return AsyncClient(username, password,
+                           session=self.session(None if metrics is None else [metrics.trace_config()]), **kwargs)
+
+    async def close(self) -> None:
+        '''
+        Close all connections: sessions created by the pool cannot be used anymore.
+        '''
+        if self._connector is not None:
+            _LOGGER.debug('Closing pool connections')
+            await self._connector.close()
+            self._connector = None
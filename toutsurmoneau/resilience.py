@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import email.utils
+import random
+import time
+from typing import Optional, Iterable
+from .errors import CircuitOpenError
+
+# HTTP status codes worth a retry: throttling and temporary server errors
+TRANSIENT_HTTP_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class RateLimiter():
+    '''
+    Token bucket: limits the rate of requests sent to a provider host.
+
+    Share the same object between clients of the same host.
+    '''
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        '''
+        :param rate: sustained number of requests per second
+        :param burst: number of requests that can be sent at once after an idle period
+        '''
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst at least 1')
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        '''
+        Wait until a request can be sent.
+        '''
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class RetryPolicy():
+    '''
+    Retry of transient errors with jittered exponential backoff, honoring Retry-After.
+    '''
+
+    def __init__(self, attempts: int = 3, backoff: float = 0.5, max_delay: float = 30.0,
+                 statuses: Iterable[int] = TRANSIENT_HTTP_STATUSES) -> None:
+        '''
+        :param attempts: maximum number of attempts, including the first one
+        :param backoff: base delay in seconds, doubled on each attempt
+        :param max_delay: maximum delay in seconds between attempts, also caps Retry-After
+        :param statuses: HTTP status codes to retry
+        '''
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+        self.attempts = attempts
+        self.statuses = frozenset(statuses)
+        self._backoff = backoff
+        self._max_delay = max_delay
+
+    def _retry_after(self, value: Optional[str]) -> Optional[float]:
+        '''
+        :param value: value of header Retry-After: seconds or HTTP date
+        :returns: delay in seconds, or None if not provided or invalid
+        '''
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        '''
+        :param attempt: number of the attempt that failed, starting at 1
+        :param retry_after: value of header Retry-After, if any
+        :returns: delay in seconds before next attempt
+        '''
+        delay = random.uniform(0, min(self._max_delay, self._backoff * 2 ** (attempt - 1)))
+        server_delay = self._retry_after(retry_after)
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        return min(delay, self._max_delay)
+
+
+class CircuitBreaker():
+    '''
+    Fail fast while a provider host is unhealthy.
+
+    After failure_threshold consecutive failures, requests are refused during reset_timeout,
+    then a single trial request is let through: success closes the circuit, failure opens it again.
+    Share the same object between clients of the same host.
+    '''
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        '''
+        :param failure_threshold: number of consecutive failures that opens the circuit
+        :param reset_timeout: seconds before a trial request is allowed
+        '''
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be at least 1')
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        '''
+        :returns: True if requests are currently refused
+        '''
+        return self._opened_at is not None and time.monotonic() - self._opened_at < self._reset_timeout
+
+    def before_request(self) -> None:
+        '''
+        Raise CircuitOpenError if the request shall not be sent.
+        '''
+        if self._opened_at is None:
+            return
+        now = time.monotonic()
+        if now - self._opened_at < self._reset_timeout:
+            remaining = self._reset_timeout - (now - self._opened_at)
+            raise CircuitOpenError(f'Provider unavailable, retry in {remaining:.1f}s')
+        # trial request: the next one waits for another period
+        self._opened_at = now
+
+    def record_success(self) -> None:
+        '''
+        Close the circuit.
+        '''
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        '''
+        Count a failure, open the circuit if threshold reached.
+        '''
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
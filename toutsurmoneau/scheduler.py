@@ -0,0 +1,198 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import random
+from typing import Optional, List, Hashable, Callable, Awaitable
+from .async_client import AsyncClient
+
+_LOGGER = logging.getLogger(__name__)
+# seconds between polls inside the publication window
+SCHEDULER_DENSE_INTERVAL = 900
+# seconds between polls when publication is unknown or late
+SCHEDULER_SPARSE_INTERVAL = 3 * 3600
+# seconds added before and after the learned publication window
+SCHEDULER_MARGIN = 1800
+# number of publication times kept per meter
+SCHEDULER_HISTORY = 14
+# number of observations before outliers are ignored
+SCHEDULER_MIN_OBSERVATIONS = 5
+
+
+class PollingScheduler():
+    '''
+    Learn when each provider publishes new readings of each meter, and plan polls accordingly.
+
+    Providers publish the index of a day once, one or a few days later, at a fairly stable time: polls are dense
+    around the learned time of day, and rare otherwise. The publication lag (days between a day and the
+    publication of its index) is also learned for each meter. Poll times of meters are spread inside intervals, so that
+    many meters do not poll at the same time.
+    '''
+
+    def __init__(self, dense_interval: float = SCHEDULER_DENSE_INTERVAL,
+                 sparse_interval: float = SCHEDULER_SPARSE_INTERVAL, margin: float = SCHEDULER_MARGIN,
+                 history: int = SCHEDULER_HISTORY) -> None:
+        '''
+        :param dense_interval: seconds between polls inside the publication window
+        :param sparse_interval: seconds between polls when publication is unknown or late
+        :param margin: seconds added before and after the learned publication window
+        :param history: number of publication times kept per meter
+        '''
+        self._dense_interval = dense_interval
+        self._sparse_interval = sparse_interval
+        self._margin = margin
+        self._history = history
+        # key -> {'latest': date of latest reading, 'published': [seconds after midnight],
+        #         'lags': [days between reading and its publication], 'failures': number of consecutive failed polls}
+        self._meters = {}
+
+    def _meter(self, key: Hashable) -> dict:
+        if key not in self._meters:
+            self._meters[key] = {'latest': None, 'published': [], 'lags': [], 'failures': 0}
+        return self._meters[key]
+
+    def lag(self, key: Hashable) -> int:
+        '''
+        :returns: days between a reading and its publication, 1 if not learned yet
+        '''
+        lags = self._meter(key)['lags']
+        # a late publication must not make the meter look up to date before it is
+        return min(lags) if lags else 1
+
+    def failed(self, key: Hashable) -> None:
+        '''
+        Record a failed poll (e.g. login refused, provider down): next polls back off until one succeeds.
+        '''
+        self._meter(key)['failures'] += 1
+
+    def observe(self, key: Hashable, latest: Optional[datetime.date], now: Optional[datetime.datetime] = None) -> bool:
+        '''
+        Record the result of a poll.
+
+        :param key: identifies the meter, e.g. (provider, meter_id)
+        :param latest: date of the latest valid reading, None if none
+        :param now: time of poll, default: now
+        :returns: True if the reading is new
+        '''
+        if now is None:
+            now = datetime.datetime.now()
+        meter = self._meter(key)
+        meter['failures'] = 0
+        if latest is None or (meter['latest'] is not None and latest <= meter['latest']):
+            return False
+        # first poll only tells the state: time of publication is unknown
+        if meter['latest'] is not None:
+            meter['published'].append(now.hour * 3600 + now.minute * 60 + now.second)
+            meter['lags'].append((now.date() - latest).days)
+            del meter['published'][:-self._history]
+            del meter['lags'][:-self._history]
+        meter['latest'] = latest
+        return True
+
+    def window(self, key: Hashable) -> Optional[tuple]:
+        '''
+        :returns: (start, end) of publication window in seconds after midnight, None if not learned yet
+        '''
+        published = sorted(self._meter(key)['published'])
+        if not published:
+            return None
+        if len(published) >= SCHEDULER_MIN_OBSERVATIONS:
+            # ignore earliest and latest 10%
+            trim = len(published) // 10
+            published = published[trim:len(published) - trim]
+        return (max(0, published[0] - self._margin), min(86400, published[-1] + self._margin))
+
+    def _spread(self, key: Hashable, interval: float) -> float:
+        '''
+        :returns: stable offset of the meter in [0, interval[, so that meters do not poll together
+        '''
+        digest = hashlib.sha256(repr(key).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 2 ** 32 * interval
+
+    def next_poll(self, key: Hashable, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+        '''
+        :param key: identifies the meter
+        :param now: reference time, default: now
+        :returns: time of next poll of the meter
+        '''
+        if now is None:
+            now = datetime.datetime.now()
+        meter = self._meter(key)
+        if meter['failures']:
+            # exponential back off, up to sparse interval
+            interval = min(self._sparse_interval, self._dense_interval * 2 ** (meter['failures'] - 1))
+            return now + datetime.timedelta(seconds=interval / 2 + self._spread(key, interval / 2))
+        window = self.window(key)
+        midnight = datetime.datetime.combine(now.date(), datetime.time())
+        # up to date if the reading published today (with the lag of the meter) is known
+        up_to_date = meter['latest'] is not None and \
+            meter['latest'] >= now.date() - datetime.timedelta(days=self.lag(key))
+        if window is None:
+            interval = self._sparse_interval if up_to_date else self._dense_interval
+            return now + datetime.timedelta(seconds=interval / 2 + self._spread(key, interval / 2))
+        start = midnight + datetime.timedelta(seconds=window[0])
+        end = midnight + datetime.timedelta(seconds=window[1])
+        if up_to_date:
+            # up to date: wait for window of tomorrow
+            start += datetime.timedelta(days=1)
+            return start + datetime.timedelta(seconds=self._spread(key, self._dense_interval))
+        if now < start:
+            return start + datetime.timedelta(seconds=self._spread(key, self._dense_interval))
+        if now < end:
+            return now + datetime.timedelta(seconds=self._dense_interval * random.uniform(0.8, 1.2))
+        # late publication: back off
+        return now + datetime.timedelta(
+            seconds=self._sparse_interval / 2 + self._spread(key, self._sparse_interval / 2))
+
+    def state(self) -> dict:
+        '''
+        :returns: learned data, as JSON serializable dict (keys are converted to strings)
+        '''
+        return {repr(key): {'latest': None if meter['latest'] is None else meter['latest'].isoformat(),
+                            'published': list(meter['published']), 'lags': list(meter['lags'])}
+                for key, meter in self._meters.items()}
+
+    def load_state(self, state: dict, keys: List[Hashable]) -> None:
+        '''
+        Restore learned data of the given meters from state().
+        '''
+        for key in keys:
+            saved = state.get(repr(key))
+            if saved is not None:
+                meter = self._meter(key)
+                meter['latest'] = None if saved['latest'] is None else datetime.date.fromisoformat(saved['latest'])
+                meter['published'] = list(saved['published'])[-self._history:]
+                meter['lags'] = list(saved.get('lags', []))[-self._history:]
+
+
+async def async_poll(clients: List[AsyncClient], on_reading: Callable[[AsyncClient, dict], Awaitable],
+                     scheduler: Optional[PollingScheduler] = None) -> None:
+    '''
+    Poll the latest reading of each client when new data is expected, until cancelled.
+
+    :param clients: clients to poll, each with one meter
+    :param on_reading: coroutine function called with the client and the reading (see async_latest_reading),
+                       when a new reading is found
+    :param scheduler: learned publication times, default: a new scheduler
+    '''
+    if scheduler is None:
+        scheduler = PollingScheduler()
+
+    async def poll_client(client: AsyncClient) -> None:
+        key = None
+        while True:
+            try:
+                if key is None:
+                    key = (client.provider_name(), await client.async_meter_id())
+                reading = await client.async_latest_reading()
+                if scheduler.observe(key, reading['date']):
+                    await on_reading(client, reading)
+            except Exception as error:
+                _LOGGER.debug('Poll failed for %s: %s', client.username(), error)
+                scheduler.failed(client.username() if key is None else key)
+            now = datetime.datetime.now()
+            next_poll = scheduler.next_poll(client.username() if key is None else key, now)
+            _LOGGER.debug('Next poll of %s at %s', client.username(), next_poll)
+            await asyncio.sleep((next_poll - now).total_seconds())
+
+    await asyncio.gather(*[poll_client(client) for client in clients])
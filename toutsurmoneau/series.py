@@ -0,0 +1,157 @@
+import array
+import datetime
+from typing import Iterable, Optional, Union
+
+# no reading for meter (total is zero means no value available for meter reading)
+METER_NO_VALUE = 0
+
+
+def parse_date(text: str) -> datetime.date:
+    '''
+    :param text: date from API, e.g. 2024-01-31 or 2024-01-31 00:00:00
+    :returns: the date, parsed with a fixed-format fast path
+    '''
+    try:
+        return datetime.date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+    except ValueError:
+        # not the expected format: let strptime report the error
+        return datetime.datetime.strptime(text.split(' ')[0], '%Y-%m-%d').date()
+
+
+def _convert_volume(volume_m3: Optional[float], use_litre: bool) -> Union[float, int, None]:
+    '''
+    :returns: volume converted from API (m3) to desired unit (m3 or litre, truncated), None if None
+    '''
+    if volume_m3 is None or not use_litre:
+        return volume_m3
+    return int(1000 * volume_m3)
+
+
+def _numpy():
+    '''
+    :returns: the numpy module, imported on first use (optional dependency)
+    '''
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError('numpy is required for this feature: pip install toutsurmoneau[numpy]') from error
+    return numpy
+
+
+class TelemetrySeries():
+    '''
+    Compact telemetry measures: parallel columns of dates (ordinal), volumes and indexes (API unit: m3).
+    '''
+    __slots__ = ('mode', 'use_litre', 'dates', 'volumes', 'indexes')
+
+    def __init__(self, mode: str, use_litre: bool = True) -> None:
+        '''
+        :param mode: monthly or daily
+        :param use_litre: views use Litre as unit if True, else api native unit (cubic meter)
+        '''
+        self.mode = mode
+        self.use_litre = use_litre
+        self.dates = array.array('l')
+        self.volumes = array.array('d')
+        self.indexes = array.array('d')
+
+    @classmethod
+    def from_measures(cls, measures: Iterable[dict], mode: str, use_litre: bool = True) -> 'TelemetrySeries':
+        '''
+        :param measures: measures as returned by the telemetry API
+        :returns: a new series with the measures
+        '''
+        series = cls(mode, use_litre)
+        series.extend(measures)
+        return series
+
+    def extend(self, measures: Iterable[dict]) -> None:
+        '''
+        Append measures as returned by the telemetry API, missing values are stored as METER_NO_VALUE.
+        '''
+        dates, volumes, indexes = self.dates, self.volumes, self.indexes
+        for measure in measures:
+            dates.append(parse_date(measure['date']).toordinal())
+            volume = measure['volume']
+            volumes.append(METER_NO_VALUE if volume is None else volume)
+            index = measure['index']
+            indexes.append(METER_NO_VALUE if index is None else index)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def date(self, position: int) -> datetime.date:
+        '''
+        :returns: date of measure at position
+        '''
+        return datetime.date.fromordinal(self.dates[position])
+
+    def valid(self) -> 'TelemetrySeries':
+        '''
+        :returns: a new series with only measures having a meter reading (future values have none)
+        '''
+        result = TelemetrySeries(self.mode, self.use_litre)
+        for position, index in enumerate(self.indexes):
+            if int(index) != METER_NO_VALUE:
+                result.dates.append(self.dates[position])
+                result.volumes.append(self.volumes[position])
+                result.indexes.append(index)
+        return result
+
+    def _converted(self, values: array.array) -> list:
+        '''
+        :returns: values converted from API (m3) to desired unit (m3 or litre)
+        '''
+        if self.use_litre:
+            return [_convert_volume(value, True) for value in values]
+        return values.tolist()
+
+    def to_numpy(self, litre: Optional[bool] = None) -> dict:
+        '''
+        :param litre: convert volumes to litre (vectorized), default: use_litre
+        :returns: dict of numpy arrays: date (datetime64[D]), volume, index
+        '''
+        numpy = _numpy()
+        if litre is None:
+            litre = self.use_litre
+        # ordinal of 1970-01-01 is the epoch of datetime64
+        epoch = datetime.date(1970, 1, 1).toordinal()
+        result = {
+            'date': (numpy.frombuffer(self.dates, dtype=numpy.dtype(f'i{self.dates.itemsize}')) - epoch)
+            .astype('datetime64[D]'),
+            'volume': numpy.frombuffer(self.volumes, dtype=numpy.float64),
+            'index': numpy.frombuffer(self.indexes, dtype=numpy.float64),
+        }
+        if litre:
+            for key in ['volume', 'index']:
+                result[key] = (result[key] * 1000).astype(numpy.int64)
+        return result
+
+    def daily_view(self) -> dict:
+        '''
+        :returns: {daily: {day_in_month: volume}, absolute: {day_in_month: index}} for valid measures
+        '''
+        valid = self.valid()
+        days = [datetime.date.fromordinal(ordinal).day for ordinal in valid.dates]
+        return {
+            'daily': dict(zip(days, self._converted(valid.volumes))),
+            'absolute': dict(zip(days, self._converted(valid.indexes))),
+        }
+
+    def monthly_view(self) -> dict:
+        '''
+        :returns: {monthly: {year: {month: volume}}, absolute: {year: {month: index}}} for valid measures
+        '''
+        valid = self.valid()
+        result = {
+            'monthly': {},
+            'absolute': {}
+        }
+        for ordinal, volume, index in zip(valid.dates, self._converted(valid.volumes), self._converted(valid.indexes)):
+            date = datetime.date.fromordinal(ordinal)
+            if date.year not in result['monthly']:
+                result['monthly'][date.year] = {}
+                result['absolute'][date.year] = {}
+            result['monthly'][date.year][date.month] = volume
+            result['absolute'][date.year][date.month] = index
+        return result
@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from typing import Optional, List, Any
+from aiohttp import web
+from .async_client import _retrieve_exception
+from .fleet import FleetAccount
+from .metrics import Metrics
+from .pool import ConnectionPool
+
+_LOGGER = logging.getLogger(__name__)
+# seconds between background refreshes of an account
+SERVER_REFRESH_INTERVAL = 3600
+# data refreshed in background for each account: name -> (method, arguments)
+SERVER_REFRESHED = {
+    'contracts': ('contracts', ()),
+    # refresh=True: the client keeps the list read first
+    'meter_list': ('meter_list', (True,)),
+    'latest_reading': ('latest_reading', ()),
+    'monthly_recent': ('monthly_recent', ()),
+    'analytics': ('analytics', ()),
+}
+
+
+def _json_default(value: Any) -> str:
+    '''
+    Serialize dates for JSON.
+    '''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+class ReadingServer():
+    '''
+    Keep sessions of accounts logged in, refresh their data in background, and answer local HTTP/JSON requests
+    from memory:
+
+    - GET /accounts
+    - GET /accounts/{username}/{contracts|meter_list|latest_reading|monthly_recent|analytics}
+    - GET /accounts/{username}/daily?month=YYYYMM (default: current month)
+    - GET /metrics (Prometheus text format)
+
+    Responses are serialized once when data is refreshed. Data not refreshed in background (daily of months before
+    the previous one, which are complete) is fetched on first request, concurrent requests share the same upstream call.
+    If a refresh fails, the last good data is still served. Errors are kept, during refresh_interval, only when
+    there is no good data, so that a failing account is not called on each request.
+    '''
+
+    def __init__(self, accounts: List[FleetAccount], refresh_interval: float = SERVER_REFRESH_INTERVAL,
+                 pool: Optional[ConnectionPool] = None, **client_options: Any) -> None:
+        '''
+        :param accounts: list of FleetAccount (or tuples: username, password, meter_id, url)
+        :param refresh_interval: seconds between background refreshes of an account
+        :param pool: connections shared by accounts, default: a pool owned by the server
+        :param client_options: other parameters of AsyncClient (e.g. session_store, store, retry_policy)
+        '''
+        self._accounts = {account.username: account for account in [FleetAccount(*item) for item in accounts]}
+        self._refresh_interval = refresh_interval
+        self._own_pool = pool is None
+        self._pool = ConnectionPool() if pool is None else pool
+        self._client_options = client_options
+        self._metrics = Metrics()
+        self._clients = {}
+        # (username, name) -> (HTTP status, serialized response body, time of fetch)
+        self._bodies = {}
+        # (username, name) -> future of response body, while fetched
+        self._in_flight = {}
+        self._tasks = []
+
+    def _client(self, username: str):
+        '''
+        :returns: the client of the account, created on first use
+        '''
+        if username not in self._clients:
+            account = self._accounts[username]
+            self._clients[username] = self._pool.client(
+                account.username, account.password, meter_id=account.meter_id, url=account.url,
+                metrics=self._metrics, **self._client_options)
+        return self._clients[username]
+
+    async def _async_fetch(self, username: str, name: str, method: str, *args: Any) -> bytes:
+        '''
+        Call the client and keep the serialized result.
+
+        :returns: the response body
+        '''
+        key = (username, name)
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            # own task: cancelling one caller does not cancel the request of the others
+            in_flight = self._in_flight[key] = asyncio.ensure_future(self._async_request(key, method, *args))
+            in_flight.add_done_callback(_retrieve_exception)
+        else:
+            self._metrics.increment('server_coalesced')
+        return await asyncio.shield(in_flight)
+
+    async def _async_request(self, key: tuple, method: str, *args: Any) -> bytes:
+        '''
+        :returns: the serialized result of the client call, also kept in memory
+        '''
+        try:
+            data = await getattr(self._client(key[0]), f'async_{method}')(*args)
+        except Exception as error:
+            # last good data is still served
+            if self._bodies.get(key, (None,))[0] != 200:
+                self._bodies[key] = (502, json.dumps({'error': str(error)}).encode('utf-8'), time.monotonic())
+            raise
+        finally:
+            del self._in_flight[key]
+        body = json.dumps(data, default=_json_default).encode('utf-8')
+        self._bodies[key] = (200, body, time.monotonic())
+        return body
+
+    async def _async_refresh(self, username: str) -> None:
+        '''
+        Refresh data of the account in background, until cancelled.
+        '''
+        while True:
+            today = datetime.date.today()
+            # last days of a month are published at the beginning of the next one
+            previous_month = (today.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+            calls = dict(SERVER_REFRESHED)
+            for month in [previous_month, today]:
+                calls[f'daily {month:%Y%m}'] = ('daily_for_month', (month,))
+            results = await asyncio.gather(
+                *[self._async_fetch(username, name, method, *args) for name, (method, args) in calls.items()],
+                return_exceptions=True)
+            for name, result in zip(calls, results):
+                if isinstance(result, Exception):
+                    _LOGGER.warning('Refresh of %s for %s failed: %s', name, username, result)
+            await asyncio.sleep(self._refresh_interval)
+
+    async def _handle_accounts(self, request: web.Request) -> web.Response:
+        return web.json_response(sorted(self._accounts))
+
+    async def _handle_data(self, request: web.Request) -> web.Response:
+        username = request.match_info['username']
+        name = request.match_info['name']
+        if username not in self._accounts:
+            raise web.HTTPNotFound(text=f'No such account: {username}')
+        if name == 'daily':
+            try:
+                month = datetime.datetime.strptime(request.query.get('month', f'{datetime.date.today():%Y%m}'),
+                                                   '%Y%m').date()
+            except ValueError:
+                raise web.HTTPBadRequest(text='Expecting month=YYYYMM')
+            name, call = f'daily {month:%Y%m}', ('daily_for_month', (month,))
+        elif name in SERVER_REFRESHED:
+            call = SERVER_REFRESHED[name]
+        else:
+            raise web.HTTPNotFound(text=f'Use one of: daily, {", ".join(SERVER_REFRESHED)}')
+        key = (username, name)
+        cached = self._bodies.get(key)
+        if cached is not None and (cached[0] == 200 or time.monotonic() - cached[2] < self._refresh_interval):
+            self._metrics.increment('server_hits')
+        else:
+            self._metrics.increment('server_misses')
+            try:
+                await self._async_fetch(username, name, call[0], *call[1])
+            except Exception as error:
+                _LOGGER.debug('Fetch of %s for %s failed: %s', name, username, error)
+            cached = self._bodies[key]
+        return web.Response(status=cached[0], body=cached[1], content_type='application/json')
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self._metrics.to_prometheus(), content_type='text/plain')
+
+    async def _on_startup(self, application: web.Application) -> None:
+        self._tasks = [asyncio.ensure_future(self._async_refresh(username)) for username in self._accounts]
+
+    async def _on_cleanup(self, application: web.Application) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for client in self._clients.values():
+            await client._client_session.close()
+        if self._own_pool:
+            await self._pool.close()
+
+    def application(self) -> web.Application:
+        '''
+        :returns: the web application, refreshing data while running
+        '''
+        application = web.Application()
+        application.router.add_get('/accounts', self._handle_accounts)
+        application.router.add_get('/accounts/{username}/{name}', self._handle_data)
+        application.router.add_get('/metrics', self._handle_metrics)
+        application.on_startup.append(self._on_startup)
+        application.on_cleanup.append(self._on_cleanup)
+        return application
+
+    def run(self, host: str = '127.0.0.1', port: int = 8080) -> None:
+        '''
+        Serve until interrupted.
+        '''
+        web.run_app(self.application(), host=host, port=port, print=None)
@@ -0,0 +1,90 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def write_private_json(path: str, data: dict) -> None:
+    '''
+    Atomically replace the file with data as JSON, readable by the owner only.
+    '''
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=folder, prefix='.session')
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(data, file)
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class SessionStore():
+    '''
+    Persist login cookies on disk, keyed by provider URL and username.
+
+    The file contains session cookies: it is created readable by the owner only.
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''
+        :param path: path of the JSON file holding sessions, created on first save
+        '''
+        self._path = os.path.expanduser(path)
+
+    def _key(self, url: str, username: str) -> str:
+        '''
+        :returns: key of the session: usernames are not stored in clear
+        '''
+        return hashlib.sha256(f'{url}\n{username}'.encode('utf-8')).hexdigest()
+
+    def _read(self) -> dict:
+        '''
+        :returns: all sessions in file, empty if file does not exist or is not readable
+        '''
+        try:
+            with open(self._path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            _LOGGER.debug('Ignoring session file %s: %s', self._path, error)
+            return {}
+
+    def _write(self, sessions: dict) -> None:
+        '''
+        Atomically replace the file with the given sessions.
+        '''
+        write_private_json(self._path, sessions)
+
+    def load(self, url: str, username: str) -> Dict[str, str]:
+        '''
+        :returns: saved cookies (name: value) for the account, empty if none
+        '''
+        return self._read().get(self._key(url, username), {}).get('cookies', {})
+
+    def save(self, url: str, username: str, cookies: Dict[str, str]) -> None:
+        '''
+        Save cookies (name: value) for the account.
+        '''
+        sessions = self._read()
+        sessions[self._key(url, username)] = {
+            'cookies': cookies,
+            'saved': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        self._write(sessions)
+
+    def clear(self, url: str, username: str) -> None:
+        '''
+        Forget saved cookies for the account.
+        '''
+        sessions = self._read()
+        if sessions.pop(self._key(url, username), None) is not None:
+            self._write(sessions)
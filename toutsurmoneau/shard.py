@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import queue
+from typing import Optional, Any, List, Callable, Awaitable, Union, Iterator
+from .errors import ClientError
+from .fleet import AsyncFleet, FleetAccount, FleetResult, FLEET_MAX_CONCURRENCY, FLEET_MAX_PER_HOST
+
+_LOGGER = logging.getLogger(__name__)
+# default maximum number of accounts processed at the same time by one worker
+SHARD_WORKER_CONCURRENCY = 20
+# seconds between checks that workers are still alive, while waiting for results
+SHARD_POLL_INTERVAL = 1.0
+
+
+def _encode(index: int, result: FleetResult) -> bytes:
+    '''
+    :returns: the result serialized once, ready to be sent to the parent process
+    '''
+    try:
+        return pickle.dumps((index, result.data, result.error), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as error:
+        _LOGGER.debug('Cannot send result of account %d: %s', index, error)
+        failure = result.error if result.error is not None else error
+        return pickle.dumps((index, None, ClientError(f'{type(failure).__name__}: {failure}')),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+
+async def _async_run_shard(shard: List[int], accounts: List[FleetAccount], job, args: tuple,
+                           fleet_options: dict, results) -> None:
+    '''
+    Run the job on the accounts of the shard, and send results as they finish.
+    '''
+    async with AsyncFleet(accounts, **fleet_options) as fleet:
+        async for result in fleet.as_completed(job, *args):
+            results.put(_encode(shard[result.index], result))
+
+
+def _run_shard(number: int, shard: List[int], accounts: List[FleetAccount], job, args: tuple,
+               fleet_options: dict, results) -> None:
+    '''
+    Entry point of a worker process: own event loop and sessions.
+    '''
+    try:
+        asyncio.run(_async_run_shard(shard, accounts, job, args, fleet_options, results))
+    finally:
+        # end of shard
+        results.put(number)
+
+
+class ShardRunner():
+    '''
+    Run the same AsyncClient call on a very large fleet, with accounts spread over worker processes.
+
+    Each worker has its own event loop and sessions (see AsyncFleet), so that response decoding and
+    result building use several cores. Results are serialized once in the worker and sent to the parent.
+    '''
+
+    def __init__(self, accounts: List[FleetAccount], workers: Optional[int] = None,
+                 max_concurrency: int = FLEET_MAX_CONCURRENCY * 4, worker_concurrency: int = SHARD_WORKER_CONCURRENCY,
+                 max_per_host: int = FLEET_MAX_PER_HOST * 4, **fleet_options: Any) -> None:
+        '''
+        Initialize the runner but no process is started.
+
+        :param accounts: list of FleetAccount (or tuples: username, password, meter_id, url)
+        :param workers: number of worker processes, default: number of CPUs (at most one per account)
+        :param max_concurrency: maximum number of accounts processed at the same time, all workers
+        :param worker_concurrency: maximum number of accounts processed at the same time by one worker
+        :param max_per_host: maximum number of accounts processed at the same time on one provider host, all workers
+        :param fleet_options: other parameters of AsyncFleet (use_litre, rate_limit, retry_policy, failure_threshold)
+
+        Limits of all workers are shared equally between workers, rate_limit applies to each worker.
+        '''
+        self._accounts = [FleetAccount(*account) for account in accounts]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._workers = max(1, min(workers, len(self._accounts)))
+        self._fleet_options = dict(fleet_options)
+        self._fleet_options['max_concurrency'] = max(1, min(worker_concurrency,
+                                                            math.ceil(max_concurrency / self._workers)))
+        self._fleet_options['max_per_host'] = max(1, math.ceil(max_per_host / self._workers))
+
+    @property
+    def accounts(self) -> List[FleetAccount]:
+        '''
+        :returns: the accounts of the fleet
+        '''
+        return self._accounts
+
+    def _shards(self) -> List[List[int]]:
+        '''
+        :returns: indexes of accounts of each worker, interleaved so that hosts are spread over workers
+        '''
+        return [list(range(number, len(self._accounts), self._workers)) for number in range(self._workers)]
+
+    def run(self, job: Union[str, Callable[..., Awaitable]], *args: Any, ordered: bool = True) -> Iterator[FleetResult]:
+        '''
+        Run the job on all accounts.
+
+        :param job: name of an AsyncClient method without the async_ prefix (e.g. 'latest_meter_reading'),
+                    or a module-level coroutine function called with the client as first argument.
+        :param args: additional arguments for the job, must be picklable
+        :param ordered: yield results in the order of accounts (as soon as possible), else in order of completion
+        :returns: an iterator on FleetResult
+        '''
+        if not ordered:
+            yield from self._completed(job, args)
+            return
+        # results received before previous ones
+        pending = {}
+        next_index = 0
+        for result in self._completed(job, args):
+            pending[result.index] = result
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+    def _drain(self, results) -> list:
+        '''
+        :returns: messages already in the queue
+        '''
+        messages = []
+        while True:
+            try:
+                messages.append(results.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def _completed(self, job, args: tuple) -> Iterator[FleetResult]:
+        '''
+        Start workers, and yield results in order of completion.
+        '''
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        shards = self._shards()
+        processes = {}
+        for number, shard in enumerate(shards):
+            process = context.Process(
+                target=_run_shard, name=f'toutsurmoneau-shard-{number}', daemon=True,
+                args=(number, shard, [self._accounts[index] for index in shard], job, args,
+                      self._fleet_options, results))
+            process.start()
+            processes[number] = process
+        received = set()
+        try:
+            while processes:
+                try:
+                    messages = [results.get(timeout=SHARD_POLL_INTERVAL)]
+                except queue.Empty:
+                    # workers that ended without end of shard message...
+                    ended = [number for number, process in processes.items() if not process.is_alive()]
+                    if not ended:
+                        continue
+                    # ...may have sent their last messages meanwhile
+                    messages = self._drain(results)
+                else:
+                    ended = []
+                for message in messages:
+                    if isinstance(message, int):
+                        # end of shard, ignored if worker already reported dead
+                        if message in processes:
+                            processes.pop(message).join()
+                        continue
+                    index, data, error = pickle.loads(message)
+                    if index not in received:
+                        received.add(index)
+                        yield FleetResult(index=index, account=self._accounts[index], data=data, error=error)
+                for number in ended:
+                    process = processes.pop(number, None)
+                    if process is None:
+                        continue
+                    process.join()
+                    # accounts without result: worker crashed or failed
+                    for index in shards[number]:
+                        if index not in received:
+                            received.add(index)
+                            yield FleetResult(index=index, account=self._accounts[index], error=ClientError(
+                                f'No result from worker process (exit code {process.exitcode})'))
+        finally:
+            for process in processes.values():
+                process.terminate()
+                process.join()
@@ -0,0 +1,154 @@
+import datetime
+import json
+import logging
+import os
+import sqlite3
+from typing import Optional, List, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+# values older than this number of days are considered final (provider does not change them anymore),
+# newer ones only once published, up to the first day not published yet
+STORE_SETTLE_DAYS = 5
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS telemetry (
+    meter TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    date TEXT NOT NULL,
+    volume REAL,
+    idx REAL,
+    measure TEXT NOT NULL,
+    PRIMARY KEY (meter, mode, date)
+);
+CREATE TABLE IF NOT EXISTS coverage_ranges (
+    meter TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    first TEXT NOT NULL,
+    last TEXT NOT NULL,
+    PRIMARY KEY (meter, mode, first)
+);
+'''
+# stores created with a single complete range per meter and mode
+_MIGRATION = '''
+INSERT OR IGNORE INTO coverage_ranges (meter, mode, first, last) SELECT meter, mode, first, last FROM coverage;
+DROP TABLE coverage;
+'''
+
+
+class TelemetryStore():
+    '''
+    Local SQLite store of telemetry measures: (meter, mode, date) -> volume, index.
+
+    The store also records which date ranges are complete for each meter and mode,
+    so that only missing dates are fetched from the provider.
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''
+        :param path: path of the SQLite database, created if needed
+        '''
+        # the store may be used from the event loop thread of a persistent Client
+        self._connection = sqlite3.connect(os.path.expanduser(path), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        if self._connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coverage'").fetchone():
+            _LOGGER.debug('Migrating coverage of %s', path)
+            self._connection.executescript(_MIGRATION)
+
+    def close(self) -> None:
+        '''
+        Close the database.
+        '''
+        self._connection.close()
+
+    def ranges(self, meter: str, mode: str) -> List[Tuple[datetime.date, datetime.date]]:
+        '''
+        :returns: (first, last) dates of each complete range, in date order, not contiguous with each other
+        '''
+        rows = self._connection.execute(
+            'SELECT first, last FROM coverage_ranges WHERE meter = ? AND mode = ? ORDER BY first', (meter, mode))
+        return [(datetime.date.fromisoformat(first), datetime.date.fromisoformat(last)) for first, last in rows]
+
+    def coverage(self, meter: str, mode: str) -> Optional[Tuple[datetime.date, datetime.date]]:
+        '''
+        :returns: first and last date of the complete ranges (there may be gaps between, see ranges),
+                  or None if nothing stored
+        '''
+        ranges = self.ranges(meter, mode)
+        if not ranges:
+            return None
+        return ranges[0][0], ranges[-1][1]
+
+    def missing_ranges(self, meter: str, mode: str, date_begin: datetime.date,
+                       date_end: datetime.date) -> List[Tuple[datetime.date, datetime.date]]:
+        '''
+        :returns: list of (begin, end) date ranges not yet complete in store
+        '''
+        one_day = datetime.timedelta(days=1)
+        result = []
+        for first, last in self.ranges(meter, mode):
+            if date_begin > date_end:
+                break
+            if date_begin < first:
+                result.append((date_begin, min(date_end, first - one_day)))
+            date_begin = max(date_begin, last + one_day)
+        if date_begin <= date_end:
+            result.append((date_begin, date_end))
+        return result
+
+    def _complete_end(self, mode: str, date_begin: datetime.date, date_end: datetime.date,
+                      measures: list) -> datetime.date:
+        '''
+        :returns: last date of a fetched range up to which values are final
+        '''
+        settled = datetime.date.today() - datetime.timedelta(days=STORE_SETTLE_DAYS)
+        if mode == 'monthly':
+            # the month in progress is not final
+            return min(date_end, settled.replace(day=1) - datetime.timedelta(days=1))
+        valid_dates = {datetime.date.fromisoformat(measure['date'][:10])
+                       for measure in measures
+                       if measure['index'] is not None and int(measure['index']) != 0}
+        # recent days: final up to the day before the first one not published yet
+        one_day = datetime.timedelta(days=1)
+        complete_end = max(settled, date_begin - one_day)
+        while complete_end < date_end and complete_end + one_day in valid_dates:
+            complete_end += one_day
+        return min(date_end, complete_end)
+
+    def add(self, meter: str, mode: str, date_begin: datetime.date, date_end: datetime.date,
+            measures: list) -> None:
+        '''
+        Store measures fetched from provider for the given range, and record it as complete (merged with complete
+        ranges it overlaps or touches).
+        '''
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO telemetry (meter, mode, date, volume, idx, measure) VALUES (?, ?, ?, ?, ?, ?)',
+                [(meter, mode, measure['date'][:10], measure['volume'], measure['index'], json.dumps(measure))
+                 for measure in measures])
+            complete_end = self._complete_end(mode, date_begin, date_end, measures)
+            if complete_end < date_begin:
+                return
+            one_day = datetime.timedelta(days=1)
+            first, last = date_begin, complete_end
+            for range_first, range_last in self.ranges(meter, mode):
+                if range_first <= complete_end + one_day and range_last >= date_begin - one_day:
+                    first, last = min(first, range_first), max(last, range_last)
+                    self._connection.execute(
+                        'DELETE FROM coverage_ranges WHERE meter = ? AND mode = ? AND first = ?',
+                        (meter, mode, range_first.isoformat()))
+            self._connection.execute(
+                'INSERT INTO coverage_ranges (meter, mode, first, last) VALUES (?, ?, ?, ?)',
+                (meter, mode, first.isoformat(), last.isoformat()))
+
+    def measures(self, meter: str, mode: str, date_begin: datetime.date, date_end: datetime.date) -> list:
+        '''
+        :returns: stored measures in the range, in date order, same format as the telemetry API
+        '''
+        if mode == 'monthly':
+            # monthly values are dated at beginning of month
+            date_begin = date_begin.replace(day=1)
+        rows = self._connection.execute(
+            'SELECT measure FROM telemetry WHERE meter = ? AND mode = ? AND date BETWEEN ? AND ? ORDER BY date',
+            (meter, mode, date_begin.isoformat(), date_end.isoformat()))
+        return [json.loads(row[0]) for row in rows]